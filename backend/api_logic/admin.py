@@ -1,3 +1,66 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+from api_logic.models import Subscription, UserSubscription
+from api_logic.services.subscription_service import cancel_subscriptions, extend_subscriptions
 
-# Register your models here.
+EXTEND_DAYS = 30
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids COUNT(*) on large unfiltered tables.
+
+    On PostgreSQL an unfiltered changelist uses the planner estimate from
+    `pg_class.reltuples`; small tables, filtered querysets and other
+    databases fall back to an exact count.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if connection.vendor == 'postgresql' and query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [self.object_list.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.exact_count_threshold:
+                return row[0]
+        return super().count
+
+
+@admin.register(Subscription)
+class SubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'price', 'interval', 'created_at')
+    search_fields = ('name',)
+    ordering = ('price',)
+
+
+@admin.register(UserSubscription)
+class UserSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'subscription', 'is_active', 'current_period_end',
+                    'cancelled_at', 'created_at')
+    list_select_related = ('user', 'subscription')
+    list_filter = ('is_active', 'subscription')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('subscription',)
+    # Exact matches only, so lookups use the indexes instead of LIKE scans.
+    search_fields = ('=stripe_subscription_id', '=user__username', '=user__email')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('deactivate_subscriptions', 'extend_subscriptions')
+
+    @admin.action(description="Deactivate selected subscriptions")
+    def deactivate_subscriptions(self, request, queryset):
+        cancelled = cancel_subscriptions(queryset.values_list('id', flat=True))
+        self.message_user(request, f"Deactivated {cancelled} subscriptions.", messages.SUCCESS)
+
+    @admin.action(description=f"Extend selected subscriptions by {EXTEND_DAYS} days")
+    def extend_subscriptions(self, request, queryset):
+        extended = extend_subscriptions(queryset.values_list('id', flat=True), EXTEND_DAYS)
+        self.message_user(request, f"Extended {extended} subscriptions.", messages.SUCCESS)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApiLogicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_logic'
+
+    def ready(self):
+        from api_logic import signals  # noqa: F401
@@ -0,0 +1,39 @@
+import hmac
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import BasePermission
+
+
+class ServicePrincipal(object):
+    """The `request.auth` value for requests made with an internal service key."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class ServiceKeyAuthentication(BaseAuthentication):
+    """Authenticates internal services by the `X-Service-Key` header.
+
+    Keys come from `settings.INTERNAL_SERVICE_KEYS` (name -> key). No user or
+    token lookup is made, so checking a key costs no database query.
+    """
+    header = 'X-Service-Key'
+
+    def authenticate(self, request):
+        key = request.headers.get(self.header)
+        if not key:
+            return None
+        for name, expected in getattr(settings, 'INTERNAL_SERVICE_KEYS', {}).items():
+            if expected and hmac.compare_digest(key.encode(), expected.encode()):
+                return AnonymousUser(), ServicePrincipal(name)
+        raise AuthenticationFailed("Invalid service key.")
+
+    def authenticate_header(self, request):
+        return self.header
+
+
+class IsInternalService(BasePermission):
+    def has_permission(self, request, view):
+        return isinstance(request.auth, ServicePrincipal)
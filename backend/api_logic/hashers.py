@@ -0,0 +1,141 @@
+import base64
+import hashlib
+import statistics
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+class TunedHasherMixin(object):
+    """Takes its cost parameters from settings.PASSWORD_HASHER_PARAMS[name],
+    where `name` is the short name used by settings.PASSWORD_HASHER.
+
+    The algorithm names are unchanged, so hashes made by Django's stock
+    hashers keep verifying. When the configured cost differs from the one
+    stored in a hash, `must_update` is true and Django re-hashes the password
+    on the next successful `check_password` (i.e. the next login).
+    """
+    name = None
+
+    def __init__(self, **params):
+        configured = getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(self.name, {})
+        for key, value in {**configured, **params}.items():
+            setattr(self, key, value)
+
+
+class TunedPBKDF2PasswordHasher(TunedHasherMixin, PBKDF2PasswordHasher):
+    name = 'pbkdf2'
+
+
+class TunedScryptPasswordHasher(TunedHasherMixin, ScryptPasswordHasher):
+    name = 'scrypt'
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Same as ScryptPasswordHasher.encode, but maxmem is sized for the
+        # n/r/p actually used: `verify` passes the cost stored in the hash,
+        # which may be higher than the configured one. OpenSSL refuses
+        # scrypt above 32 MiB unless maxmem allows it.
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=max(self.maxmem, 2 * 128 * n * r * p),
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+class TunedArgon2PasswordHasher(TunedHasherMixin, Argon2PasswordHasher):
+    name = 'argon2'
+
+
+def is_available(name):
+    """False when the library behind a hasher (e.g. argon2-cffi) is not installed."""
+    try:
+        if name == 'argon2':
+            TunedArgon2PasswordHasher()._load_library()
+    except ValueError:
+        return False
+    return True
+
+
+def time_hasher(hasher, rounds=5, password='benchmark-password'):
+    """
+    Measures how long `hasher` takes to hash one password.
+
+    Returns:
+        float: Median milliseconds over `rounds` encodes.
+    """
+    salt = hasher.salt()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.encode(password, salt)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _pbkdf2_candidates(target_ms, rounds):
+    # PBKDF2 time is linear in the iteration count: calibrate once, then try
+    # a ladder around the extrapolated count to absorb timing noise.
+    base = 100000
+    base_ms = time_hasher(TunedPBKDF2PasswordHasher(iterations=base), rounds)
+    estimate = base * target_ms / base_ms
+    counts = {max(10000, int(estimate * factor) // 10000 * 10000) for factor in (0.5, 0.75, 0.9, 1.0, 1.25)}
+    return [{'iterations': iterations} for iterations in sorted(counts)]
+
+
+def _scrypt_candidates(target_ms, rounds):
+    return [{'work_factor': 2 ** exponent} for exponent in range(12, 19)]
+
+
+def _argon2_candidates(target_ms, rounds, memory_cost=None):
+    memory_cost = memory_cost or Argon2PasswordHasher.memory_cost
+    return [{'time_cost': time_cost, 'memory_cost': memory_cost} for time_cost in range(1, 9)]
+
+
+HASHER_CLASSES = {
+    'pbkdf2': TunedPBKDF2PasswordHasher,
+    'scrypt': TunedScryptPasswordHasher,
+    'argon2': TunedArgon2PasswordHasher,
+}
+
+CANDIDATES = {
+    'pbkdf2': _pbkdf2_candidates,
+    'scrypt': _scrypt_candidates,
+    'argon2': _argon2_candidates,
+}
+
+
+def benchmark(name, target_ms, rounds=5, **candidate_options):
+    """
+    Times increasing costs of one algorithm on this host.
+
+    Costs are tried from cheapest up and the sweep stops at the first one
+    over `target_ms`.
+
+    Returns:
+        tuple[list[tuple[dict, float]], dict | None]: The (params, ms)
+        measurements and the most expensive params within the target, or
+        None if even the cheapest is too slow.
+    """
+    results = []
+    best = None
+    for params in CANDIDATES[name](target_ms, rounds, **candidate_options):
+        elapsed = time_hasher(HASHER_CLASSES[name](**params), rounds)
+        results.append((params, elapsed))
+        if elapsed > target_ms:
+            break
+        best = params
+    return results, best
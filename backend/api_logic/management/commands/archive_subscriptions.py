@@ -0,0 +1,17 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api_logic.services.history_service import archive_inactive_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Removes long-cancelled rows from the live UserSubscription table (history keeps them)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        deleted = archive_inactive_subscriptions(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {deleted} cancelled subscriptions."))
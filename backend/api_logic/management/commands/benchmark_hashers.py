@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api_logic.hashers import HASHER_CLASSES, benchmark, is_available
+
+# Environment variables read by settings.PASSWORD_HASHER_PARAMS.
+ENV_NAMES = {
+    ('pbkdf2', 'iterations'): 'PBKDF2_ITERATIONS',
+    ('scrypt', 'work_factor'): 'SCRYPT_WORK_FACTOR',
+    ('argon2', 'time_cost'): 'ARGON2_TIME_COST',
+    ('argon2', 'memory_cost'): 'ARGON2_MEMORY_COST',
+}
+
+
+class Command(BaseCommand):
+    help = ("Measures password hashing time per algorithm and cost on this host and "
+            "recommends the strongest settings that stay within a target login latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250.0,
+                            help="Hashing time budget per login in milliseconds.")
+        parser.add_argument('--algorithms', default=','.join(HASHER_CLASSES),
+                            help="Comma-separated list of: " + ', '.join(HASHER_CLASSES))
+        parser.add_argument('--rounds', type=int, default=5,
+                            help="Hashes per measurement (the median is reported).")
+        parser.add_argument('--argon2-memory-cost', type=int, default=None,
+                            help="Argon2 memory in KiB (defaults to Django's 102400).")
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['algorithms'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in HASHER_CLASSES]
+        if unknown:
+            raise CommandError(f"Unknown algorithms: {', '.join(unknown)}.")
+
+        self.stdout.write(f"Current: PASSWORD_HASHER={settings.PASSWORD_HASHER} "
+                          f"{settings.PASSWORD_HASHER_PARAMS.get(settings.PASSWORD_HASHER)}")
+        for name in names:
+            if not is_available(name):
+                self.stdout.write(self.style.WARNING(f"\n{name}: skipped, library not installed."))
+                continue
+            extra = {'memory_cost': options['argon2_memory_cost']} if name == 'argon2' else {}
+            results, best = benchmark(name, options['target_ms'], options['rounds'], **extra)
+
+            self.stdout.write(f"\n{name}:")
+            for params, elapsed in results:
+                self.stdout.write(f"  {params}  {elapsed:8.1f} ms")
+            if best is None:
+                self.stdout.write(self.style.WARNING(
+                    f"  Even the cheapest cost exceeds {options['target_ms']:.0f} ms."))
+                continue
+            env = ' '.join(
+                f"{ENV_NAMES[(name, key)]}={value}" for key, value in best.items()
+                if (name, key) in ENV_NAMES)
+            self.stdout.write(self.style.SUCCESS(f"  Recommended: PASSWORD_HASHER={name} {env}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api_logic.services.history_service import ensure_history_partitions
+
+
+class Command(BaseCommand):
+    help = "Creates upcoming monthly partitions of the subscription history table (PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3)
+
+    def handle(self, *args, **options):
+        created = ensure_history_partitions(months_ahead=options['months_ahead'])
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Created partitions: {', '.join(created)}"))
+        else:
+            self.stdout.write("No partitions to create.")
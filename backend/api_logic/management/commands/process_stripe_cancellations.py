@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api_logic.services.stripe_cancellation_service import run_worker, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Sends queued subscription cancellations to Stripe, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait when no cancellation is due.")
+        parser.add_argument('--once', action='store_true',
+                            help="Process the jobs that are due now and exit instead of running forever.")
+
+    def handle(self, *args, **options):
+        completed = run_worker(
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+            once=options['once'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Cancelled {completed} subscriptions in Stripe."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from api_logic.services.token_service import purge_expired_tokens, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Deletes expired knox auth tokens in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Rows deleted per transaction.")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches.")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        try:
+            stats = purge_expired_tokens(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                pause=options['pause'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['deleted']} expired tokens in {stats['batches']} batches "
+            f"({stats['elapsed']:.2f}s, {stats['rows_per_sec']:.0f} rows/sec)."
+        ))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api_logic.services.webhook_verification import purge_processed_events, DEFAULT_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = "Deletes processed Stripe webhook event ids older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Keep ids from the last N days (defaults to "
+                                 "STRIPE_WEBHOOK_EVENT_RETENTION_DAYS, minimum 3).")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows deleted per transaction.")
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = getattr(settings, 'STRIPE_WEBHOOK_EVENT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+        try:
+            deleted = purge_processed_events(
+                timezone.now() - timedelta(days=days), batch_size=options['batch_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} processed webhook events older than {days} days."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from api_logic.services.outbox_service import get_sink, run_relay, DEFAULT_RELAY_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Publishes subscription change events from the outbox to the configured sink."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', default=None,
+                            help="'file', 'http' or a dotted path (defaults to OUTBOX_SINK).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_RELAY_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Seconds to wait when the outbox is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the outbox and exit instead of running forever.")
+
+    def handle(self, *args, **options):
+        try:
+            sink = get_sink(options['sink'])
+        except (ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        published = run_relay(
+            sink,
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+            once=options['once'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Published {published} outbox events."))
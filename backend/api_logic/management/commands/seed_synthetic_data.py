@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from api_logic.services.seed_service import seed, DEFAULT_CHUNK_SIZE, DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = ("Bulk-loads deterministic synthetic users, auth tokens and subscriptions "
+            "through PostgreSQL COPY for load testing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('users', type=int, help="Number of users to create.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Users per COPY round trip and transaction.")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed; the same seed produces the same data.")
+        parser.add_argument('--prefix', default='loadtest', help="Username prefix.")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                            help="Password shared by every synthetic user (hashed once).")
+        parser.add_argument('--active-ratio', type=float, default=0.7,
+                            help="Share of subscriptions that are active; the rest are cancelled.")
+        parser.add_argument('--subscribed-ratio', type=float, default=0.9,
+                            help="Share of users that have a subscription row.")
+        parser.add_argument('--min-devices', type=int, default=0,
+                            help="Minimum auth tokens per user.")
+        parser.add_argument('--max-devices', type=int, default=3,
+                            help="Maximum auth tokens per user (uniformly distributed).")
+        parser.add_argument('--history-days', type=int, default=365,
+                            help="How far back sign-up dates are spread.")
+
+    def handle(self, *args, **options):
+        if options['users'] <= 0 or options['chunk_size'] <= 0:
+            raise CommandError("users and --chunk-size must be positive.")
+        if not 0 <= options['min_devices'] <= options['max_devices']:
+            raise CommandError("Expected 0 <= --min-devices <= --max-devices.")
+        for name in ('active_ratio', 'subscribed_ratio'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be between 0 and 1.")
+
+        def progress(totals):
+            self.stdout.write(
+                f"{totals['users']}/{options['users']} users, {totals['tokens']} tokens, "
+                f"{totals['subscriptions']} subscriptions ({totals['seconds']:.1f}s)")
+
+        try:
+            totals = seed(
+                options['users'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+                seed=options['seed'],
+                prefix=options['prefix'],
+                password=options['password'],
+                active_ratio=options['active_ratio'],
+                subscribed_ratio=options['subscribed_ratio'],
+                min_devices=options['min_devices'],
+                max_devices=options['max_devices'],
+                history_days=options['history_days'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        seconds = max(totals['seconds'], 1e-9)
+        rows = totals['users'] + totals['tokens'] + totals['subscriptions']
+        for table in ('users', 'tokens', 'subscriptions'):
+            self.stdout.write(f"{table}: {totals[table]} rows, {totals[table] / seconds:,.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {rows} rows in {seconds:.2f}s ({rows / seconds:,.0f} rows/s)."))
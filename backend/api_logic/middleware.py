@@ -0,0 +1,156 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import time
+import uuid
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from api_logic.services.stripe_client import record_stripe_calls
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = '__profile'
+
+
+class _QueryRecorder(object):
+    """`connection.execute_wrapper` hook that records every SQL statement with its timing."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql[:500],
+                'many': many,
+                'started': started,
+                'duration': time.perf_counter() - started,
+            })
+
+
+class RequestProfilingMiddleware(object):
+    """Profiles individual requests on demand.
+
+    A request is profiled when a staff user sends `X-Profile: 1` (or
+    `?__profile=1`), or when it is picked by `PROFILING_SAMPLE_RATE`. The
+    report (top-N functions by cumulative time, SQL and Stripe timeline) is
+    written to `PROFILING_DUMP_DIR` with the raw cProfile stats; the
+    response gets `Server-Timing` and `X-Profile-Id` headers. With
+    `X-Profile: inline` the report replaces the response body.
+
+    When `PROFILING_ENABLED` is False the middleware removes itself from the
+    chain at start-up, so it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.top_n = getattr(settings, 'PROFILING_TOP_N', 30)
+        self.dump_dir = getattr(settings, 'PROFILING_DUMP_DIR', None)
+
+    def __call__(self, request):
+        flag = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM)
+        requested = bool(flag) and flag != '0' and self._is_staff(request)
+        sampled = not requested and self.sample_rate and random.random() < self.sample_rate
+        if not (requested or sampled):
+            return self.get_response(request)
+        return self._profile(request, inline=requested and flag == 'inline')
+
+    @staticmethod
+    def _is_staff(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        # API clients authenticate with knox tokens, which DRF only checks
+        # inside the view; resolve the token here to decide up front.
+        from knox.auth import TokenAuthentication
+        from rest_framework.exceptions import AuthenticationFailed
+        try:
+            result = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return bool(result and result[0].is_staff)
+
+    def _profile(self, request, inline):
+        queries = _QueryRecorder()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with record_stripe_calls() as stripe_calls, connection.execute_wrapper(queries):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        total = time.perf_counter() - started
+
+        profile_id = uuid.uuid4().hex
+        report = self._build_report(
+            request, response, profiler, queries.queries, stripe_calls, started, total)
+        report['id'] = profile_id
+        if self.dump_dir:
+            self._dump(profile_id, profiler, report)
+
+        sql_time = sum(q['duration'] for q in queries.queries)
+        stripe_time = sum(c['duration'] for c in stripe_calls)
+        response['Server-Timing'] = (
+            f"total;dur={total * 1000:.1f}, "
+            f"sql;dur={sql_time * 1000:.1f};desc=\"{len(queries.queries)} queries\", "
+            f"stripe;dur={stripe_time * 1000:.1f};desc=\"{len(stripe_calls)} calls\""
+        )
+        response['X-Profile-Id'] = profile_id
+
+        if inline:
+            response.content = json.dumps(report, cls=DjangoJSONEncoder).encode('utf-8')
+            response['Content-Type'] = 'application/json'
+        return response
+
+    def _build_report(self, request, response, profiler, queries, stripe_calls, started, total):
+        stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats('cumulative')
+        hot = []
+        for func in stats.fcn_list[:self.top_n]:
+            primitive_calls, calls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            hot.append({
+                'function': f"{filename}:{line}({name})",
+                'calls': calls,
+                'primitive_calls': primitive_calls,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3),
+            })
+
+        timeline = [
+            {'kind': 'sql', 'offset_ms': round((q['started'] - started) * 1000, 3),
+             'duration_ms': round(q['duration'] * 1000, 3), 'detail': q['sql']}
+            for q in queries
+        ] + [
+            {'kind': 'stripe', 'offset_ms': round((c['started'] - started) * 1000, 3),
+             'duration_ms': round(c['duration'] * 1000, 3),
+             'detail': f"{c['method']} {c['url']} -> {c['status']}"}
+            for c in stripe_calls
+        ]
+        timeline.sort(key=lambda event: event['offset_ms'])
+
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'hot_functions': hot,
+            'timeline': timeline,
+        }
+
+    def _dump(self, profile_id, profiler, report):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        base = os.path.join(self.dump_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{profile_id}")
+        profiler.dump_stats(base + '.prof')
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, cls=DjangoJSONEncoder, indent=2)
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Indexes knox_authtoken.expiry so expired token cleanup avoids a full scan."""
+
+    dependencies = [
+        ('api_logic', '0002_remove_subscription_cancelled_at_and_more'),
+        ('knox', '0008_remove_authtoken_salt'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS api_logic_knox_authtoken_expiry_idx "
+                "ON knox_authtoken (expiry);",
+            reverse_sql="DROP INDEX IF EXISTS api_logic_knox_authtoken_expiry_idx;",
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.2 on 2026-10-19 12:04
+
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+HISTORY_TABLE = 'api_logic_usersubscriptionhistory'
+SEED_BATCH_SIZE = 2000
+
+# Postgres: range-partitioned by month on valid_from. The primary key has to
+# include the partition key; `id` stays unique through its sequence. The
+# current and next month are created here, later months by
+# `manage.py ensure_history_partitions`; the DEFAULT partition catches older
+# rows (the seeded history) and months that have not been created yet.
+POSTGRES_CREATE = [
+    f"""
+    CREATE TABLE {HISTORY_TABLE} (
+        id bigserial NOT NULL,
+        user_subscription_id bigint NOT NULL,
+        user_id bigint NOT NULL,
+        subscription_id bigint NOT NULL,
+        stripe_subscription_id varchar(255) NOT NULL,
+        change varchar(100) NOT NULL,
+        is_active boolean NOT NULL,
+        current_period_end timestamp with time zone NOT NULL,
+        cancelled_at timestamp with time zone NULL,
+        valid_from timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, valid_from)
+    ) PARTITION BY RANGE (valid_from);
+    """,
+    f"CREATE TABLE {HISTORY_TABLE}_default PARTITION OF {HISTORY_TABLE} DEFAULT;",
+    f"CREATE INDEX sub_history_sub_valid_idx ON {HISTORY_TABLE} (user_subscription_id, valid_from);",
+    f"CREATE INDEX sub_history_user_valid_idx ON {HISTORY_TABLE} (user_id, valid_from);",
+    f"CREATE INDEX sub_history_valid_from_idx ON {HISTORY_TABLE} (valid_from);",
+]
+
+
+def _month_partitions(now, months=2):
+    statements = []
+    for offset in range(months):
+        index = now.year * 12 + now.month - 1 + offset
+        start = datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+        end = datetime((index + 1) // 12, (index + 1) % 12 + 1, 1, tzinfo=dt_timezone.utc)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {HISTORY_TABLE}_p{start:%Y%m} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');")
+    return statements
+
+
+def create_history_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_CREATE + _month_partitions(timezone.now()):
+            schema_editor.execute(statement)
+    else:
+        schema_editor.create_model(apps.get_model('api_logic', 'UserSubscriptionHistory'))
+
+
+def seed_history(apps, schema_editor):
+    """One `subscription.activated` row per live subscription, followed by a
+    `subscription.cancelled` row where it was cancelled, so as-of queries
+    cover subscriptions that predate the history table."""
+    UserSubscription = apps.get_model('api_logic', 'UserSubscription')
+    UserSubscriptionHistory = apps.get_model('api_logic', 'UserSubscriptionHistory')
+    rows = []
+    for live in UserSubscription.objects.order_by('id').iterator(chunk_size=SEED_BATCH_SIZE):
+        common = {
+            'user_subscription_id': live.id,
+            'user_id': live.user_id,
+            'subscription_id': live.subscription_id,
+            'stripe_subscription_id': live.stripe_subscription_id,
+            'current_period_end': live.current_period_end,
+        }
+        cancelled_at = live.cancelled_at if not live.is_active else None
+        rows.append(UserSubscriptionHistory(
+            change='subscription.activated', is_active=True, cancelled_at=None,
+            valid_from=live.created_at, **common))
+        if cancelled_at:
+            rows.append(UserSubscriptionHistory(
+                change='subscription.cancelled', is_active=False, cancelled_at=cancelled_at,
+                valid_from=cancelled_at, **common))
+        if len(rows) >= SEED_BATCH_SIZE:
+            UserSubscriptionHistory.objects.bulk_create(rows)
+            rows = []
+    UserSubscriptionHistory.objects.bulk_create(rows)
+
+
+def drop_history_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {HISTORY_TABLE} CASCADE;")
+    else:
+        schema_editor.delete_model(apps.get_model('api_logic', 'UserSubscriptionHistory'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0007_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='UserSubscriptionHistory',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('user_subscription_id', models.BigIntegerField()),
+                        ('user_id', models.BigIntegerField()),
+                        ('subscription_id', models.BigIntegerField()),
+                        ('stripe_subscription_id', models.CharField(max_length=255)),
+                        ('change', models.CharField(max_length=100)),
+                        ('is_active', models.BooleanField()),
+                        ('current_period_end', models.DateTimeField()),
+                        ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                        ('valid_from', models.DateTimeField()),
+                    ],
+                    options={
+                        'indexes': [
+                            models.Index(fields=['user_subscription_id', 'valid_from'], name='sub_history_sub_valid_idx'),
+                            models.Index(fields=['user_id', 'valid_from'], name='sub_history_user_valid_idx'),
+                            models.Index(fields=['valid_from'], name='sub_history_valid_from_idx'),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_history_table, drop_history_table),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='usersubscription',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='usersubscription',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user', 'subscription'), name='unique_active_user_subscription'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0008_usersubscriptionhistory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'current_period_end'], name='active_subscription_user_idx'),
+        ),
+    ]
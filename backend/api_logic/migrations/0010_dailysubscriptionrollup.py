@@ -0,0 +1,90 @@
+# Generated by Django 5.2 on 2026-10-19 12:06
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Frozen copy of rollup_service.MONTHLY_FACTORS as of this migration.
+MONTHLY_FACTORS = {
+    'day': Decimal(365) / Decimal(12),
+    'week': Decimal(52) / Decimal(12),
+    'month': Decimal(1),
+    'year': Decimal(1) / Decimal(12),
+}
+SUBSCRIPTION_ACTIVATED = 'subscription.activated'
+SUBSCRIPTION_CANCELLED = 'subscription.cancelled'
+
+
+def seed_rollups(apps, schema_editor):
+    """Rolls up the subscriptions that exist already, so the incremental
+    updates that follow start from the right totals instead of zero."""
+    Subscription = apps.get_model('api_logic', 'Subscription')
+    UserSubscription = apps.get_model('api_logic', 'UserSubscription')
+    UserSubscriptionHistory = apps.get_model('api_logic', 'UserSubscriptionHistory')
+    DailySubscriptionRollup = apps.get_model('api_logic', 'DailySubscriptionRollup')
+
+    amounts = {
+        plan.id: (plan.price * MONTHLY_FACTORS.get(plan.interval, Decimal(1))).quantize(Decimal('0.01'))
+        for plan in Subscription.objects.all()
+    }
+    counters = defaultdict(lambda: [0, 0, Decimal(0), Decimal(0)])
+
+    def add(moment, subscription_id, index):
+        counter = counters[(timezone.localdate(moment), subscription_id)]
+        counter[index] += 1
+        counter[index + 2] += amounts.get(subscription_id, Decimal(0))
+
+    live = UserSubscription.objects.all()
+    for subscription_id, created_at, cancelled_at in live.values_list(
+            'subscription_id', 'created_at', 'cancelled_at').iterator(chunk_size=5000):
+        add(created_at, subscription_id, 0)
+        if cancelled_at:
+            add(cancelled_at, subscription_id, 1)
+
+    archived = UserSubscriptionHistory.objects.filter(
+        change__in=[SUBSCRIPTION_ACTIVATED, SUBSCRIPTION_CANCELLED]
+    ).exclude(user_subscription_id__in=live.values('id'))
+    for subscription_id, change, valid_from in archived.values_list(
+            'subscription_id', 'change', 'valid_from').iterator(chunk_size=5000):
+        add(valid_from, subscription_id, 0 if change == SUBSCRIPTION_ACTIVATED else 1)
+
+    DailySubscriptionRollup.objects.bulk_create(
+        [
+            DailySubscriptionRollup(
+                day=day, subscription_id=subscription_id,
+                new_subscribers=new, churned_subscribers=churned,
+                mrr_added=added, mrr_lost=lost)
+            for (day, subscription_id), (new, churned, added, lost) in counters.items()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0009_active_subscription_user_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySubscriptionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('new_subscribers', models.IntegerField(default=0)),
+                ('churned_subscribers', models.IntegerField(default=0)),
+                ('mrr_added', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('mrr_lost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api_logic.subscription')),
+            ],
+            options={
+                'unique_together': {('day', 'subscription')},
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
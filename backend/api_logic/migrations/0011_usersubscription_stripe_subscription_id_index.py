@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0010_dailysubscriptionrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usersubscription',
+            name='stripe_subscription_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
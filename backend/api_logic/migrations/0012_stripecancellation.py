@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0011_usersubscription_stripe_subscription_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeCancellation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_subscription_id', models.BigIntegerField()),
+                ('stripe_subscription_id', models.CharField(max_length=255)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['next_attempt_at'], name='stripe_cancellation_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0012_stripecancellation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingcheckout',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+def number_published_events(apps, schema_editor):
+    # Events published before positions existed keep their id order.
+    OutboxEvent = apps.get_model('api_logic', 'OutboxEvent')
+    published = OutboxEvent.objects.filter(published_at__isnull=False).order_by('id')
+    for position, event_id in enumerate(published.values_list('id', flat=True).iterator(), 1):
+        OutboxEvent.objects.filter(id=event_id).update(position=position)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0013_pendingcheckout_claimed_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='position',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_published_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-19 12:43
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copy of rollup_service.MONTHLY_FACTORS as of this migration.
+MONTHLY_FACTORS = {
+    'day': Decimal(365) / Decimal(12),
+    'week': Decimal(52) / Decimal(12),
+    'month': Decimal(1),
+    'year': Decimal(1) / Decimal(12),
+}
+
+
+def fill_monthly_price(apps, schema_editor):
+    """Existing subscriptions were rolled up at their plan's current price;
+    store that price so their cancellation subtracts the same amount."""
+    Subscription = apps.get_model('api_logic', 'Subscription')
+    UserSubscription = apps.get_model('api_logic', 'UserSubscription')
+    for plan in Subscription.objects.all():
+        amount = (plan.price * MONTHLY_FACTORS.get(plan.interval, Decimal(1))).quantize(Decimal('0.01'))
+        UserSubscription.objects.filter(subscription_id=plan.id, monthly_price__isnull=True).update(
+            monthly_price=amount)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_logic', '0015_streamticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersubscription',
+            name='monthly_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(fill_monthly_price, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -16,15 +17,189 @@ class Subscription(models.Model):
 class UserSubscription(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE)
-    stripe_subscription_id = models.CharField(max_length=255)
+    stripe_subscription_id = models.CharField(max_length=255, db_index=True)
     is_active = models.BooleanField(default=False)
     current_period_end = models.DateTimeField()
     cancelled_at = models.DateTimeField(null=True, blank=True)
+    # Plan price per month when the subscription started; the MRR rollups
+    # add it on activation and subtract the same amount on cancellation.
+    monthly_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ('user', 'subscription')
+        # Only one active row per plan; cancelled rows stay behind so a user
+        # can subscribe to the same plan again.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'subscription'],
+                condition=models.Q(is_active=True),
+                name='unique_active_user_subscription',
+            ),
+        ]
+        indexes = [
+            # Covers active-subscription lookups by user (single and bulk).
+            models.Index(
+                fields=['user', 'current_period_end'],
+                condition=models.Q(is_active=True),
+                name='active_subscription_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.subscription.name}"
+
+
+class PendingCheckout(models.Model):
+    """Open Stripe Checkout Session for a (user, plan) pair, reused until it expires."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE)
+    stripe_session_id = models.CharField(max_length=255, blank=True, default='')
+    checkout_url = models.TextField(blank=True, default='')
+    expires_at = models.DateTimeField(null=True, blank=True)
+    # Set while one request is creating the session in Stripe, so others wait
+    # for it without holding a transaction open across the Stripe calls.
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'subscription')
+
+    def __str__(self):
+        return f"{self.user_id} - {self.subscription_id} ({self.stripe_session_id})"
+
+
+class ProcessedWebhookEvent(models.Model):
+    """Stripe event ids that were handled already, used to drop replayed deliveries."""
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.event_id
+
+
+class PlanCatalogVersion(models.Model):
+    """Single-row counter bumped on every plan change; lets each process detect a stale catalog."""
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Plan catalog v{self.version}"
+
+
+class OutboxEvent(models.Model):
+    """Subscription state change written in the same transaction as the change itself.
+
+    The relay worker stamps new rows with a gap-free `position`, then
+    publishes them to the configured sink and sets `published_at`; the
+    change feed endpoint serves numbered rows by ascending position.
+    """
+    event_type = models.CharField(max_length=100)
+    user_id = models.BigIntegerField(db_index=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    # Ids come from a sequence at INSERT time and commit out of order, so
+    # consumers page on the publish order instead.
+    position = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='outbox_unpublished_idx',
+                         condition=models.Q(published_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.event_type} (user {self.user_id})"
+
+
+class StreamTicket(models.Model):
+    """Short-lived, single-use credential for opening a subscription event stream.
+
+    EventSource cannot send an Authorization header; the client exchanges its
+    token for a ticket and puts the ticket in the stream URL instead, so the
+    long-lived token never appears in URLs or access logs. Only the SHA-256
+    digest of the ticket is stored.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Stream ticket for {self.user_id} until {self.expires_at}"
+
+
+class UserSubscriptionHistory(models.Model):
+    """Append-only log of UserSubscription states, one row per change.
+
+    On PostgreSQL the table is range-partitioned by month on `valid_from`
+    (see migration 0008 and `manage.py ensure_history_partitions`). Rows are
+    only ever inserted; the state at a point in time is the latest row per
+    `user_subscription_id` with `valid_from` at or before it.
+    """
+    user_subscription_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    subscription_id = models.BigIntegerField()
+    stripe_subscription_id = models.CharField(max_length=255)
+    change = models.CharField(max_length=100)
+    is_active = models.BooleanField()
+    current_period_end = models.DateTimeField()
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    valid_from = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_subscription_id', 'valid_from'], name='sub_history_sub_valid_idx'),
+            models.Index(fields=['user_id', 'valid_from'], name='sub_history_user_valid_idx'),
+            models.Index(fields=['valid_from'], name='sub_history_valid_from_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_subscription_id} {self.change} @ {self.valid_from}"
+
+
+class DailySubscriptionRollup(models.Model):
+    """Per-day, per-plan subscription flows, maintained incrementally.
+
+    Active subscribers and MRR for a day are the running totals of these
+    flows, so reports read O(days) rows instead of scanning subscriptions.
+    """
+    day = models.DateField()
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE)
+    new_subscribers = models.IntegerField(default=0)
+    churned_subscribers = models.IntegerField(default=0)
+    mrr_added = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    mrr_lost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('day', 'subscription')
+
+    def __str__(self):
+        return f"{self.day} - {self.subscription_id}"
+
+
+class StripeCancellation(models.Model):
+    """Queued `cancel_at_period_end` call to Stripe for a locally cancelled subscription.
+
+    Written in the same transaction as the cancellation; the worker retries
+    with backoff until Stripe accepts it or the attempts run out, in which
+    case `next_attempt_at` is cleared and `last_error` explains why.
+    """
+    user_subscription_id = models.BigIntegerField()
+    stripe_subscription_id = models.CharField(max_length=255)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='stripe_cancellation_due_idx',
+                         condition=models.Q(completed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.stripe_subscription_id} (attempt {self.attempts})"
@@ -0,0 +1,149 @@
+import datetime
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.test.signals import setting_changed
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _default(obj):
+    """Fallback for types the fast encoders do not know (Decimal, lazy strings, ...)."""
+    return _django_encoder.default(obj)
+
+
+def _orjson_dumps(data):
+    # Datetimes are passed through to DjangoJSONEncoder so every backend
+    # writes them the same way (millisecond precision, "Z" for UTC).
+    return orjson.dumps(
+        data,
+        default=_default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+_msgspec_encoder = (
+    msgspec.json.Encoder(enc_hook=_default, decimal_format='string')
+    if msgspec is not None else None
+)
+
+# msgspec encodes these natively in its own formats (and accepts sets, which
+# the other backends reject); they go through DjangoJSONEncoder instead.
+_DJANGO_FORMATTED_TYPES = (datetime.datetime, datetime.date, datetime.time, datetime.timedelta)
+
+
+def _to_django_types(obj):
+    """Prepares `data` for msgspec so its output matches the other backends."""
+    if isinstance(obj, dict):
+        return {key: _to_django_types(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_django_types(value) for value in obj]
+    if isinstance(obj, _DJANGO_FORMATTED_TYPES):
+        return _django_encoder.default(obj)
+    if isinstance(obj, (set, frozenset)):
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return obj
+
+
+def _msgspec_dumps(data):
+    return _msgspec_encoder.encode(_to_django_types(data))
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+_BACKENDS = {
+    'orjson': (lambda: orjson is not None, _orjson_dumps),
+    'msgspec': (lambda: msgspec is not None, _msgspec_dumps),
+    'stdlib': (lambda: True, _stdlib_dumps),
+}
+
+
+def get_json_backend(name=None):
+    """
+    Resolves the JSON encoder to use.
+
+    Args:
+        name (str | None): 'auto', 'orjson', 'msgspec' or 'stdlib'. Defaults
+            to `settings.JSON_RENDERER_BACKEND` ('auto' when unset). 'auto'
+            picks orjson when installed, else stdlib: msgspec needs a Python
+            pass over the data to match the others' output, which costs
+            about what it saves, so it is only used when asked for.
+
+    Returns:
+        tuple: (backend name, dumps callable returning bytes). A requested
+        backend that is not installed falls back to the stdlib encoder.
+    """
+    name = name or getattr(settings, 'JSON_RENDERER_BACKEND', 'auto')
+    if name == 'auto':
+        if orjson is not None:
+            return 'orjson', _orjson_dumps
+        return 'stdlib', _stdlib_dumps
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    available, dumps = _BACKENDS[name]
+    if not available():
+        return 'stdlib', _stdlib_dumps
+    return name, dumps
+
+
+_configured_dumps = None
+
+
+def json_dumps(data):
+    """Serializes `data` to JSON bytes with the configured backend."""
+    global _configured_dumps
+    if _configured_dumps is None:
+        _configured_dumps = get_json_backend()[1]
+    return _configured_dumps(data)
+
+
+def _reset_configured_backend(*args, **kwargs):
+    global _configured_dumps
+    if kwargs['setting'] == 'JSON_RENDERER_BACKEND':
+        _configured_dumps = None
+
+
+setting_changed.connect(_reset_configured_backend)
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in replacement for `JsonResponse` (with safe=False) that uses `json_dumps`."""
+
+    def __init__(self, data, dumps=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=(dumps or json_dumps)(data), **kwargs)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF JSON renderer backed by the configured fast backend when available.
+
+    Requests asking for indented output (e.g. `Accept: application/json;
+    indent=4`) and data the fast path cannot encode (QuerySets, bytes,
+    generators, ...) are rendered by the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return json_dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
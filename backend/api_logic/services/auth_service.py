@@ -1,10 +1,11 @@
 from sqlite3 import IntegrityError
 from django.contrib.auth.models import User
 from rest_framework.exceptions import ValidationError
-from api_logic.serializers import UserSerializer
-from django.contrib.auth import authenticate, login
+from django.conf import settings
+from django.contrib.auth import authenticate, login, user_logged_in
 from knox.models import AuthToken
 from api_logic.utils import UserUtils
+from api_logic.services.token_service import count_active_tokens
 
 # TODO = to add confirmation by email and activation of the user account
 
@@ -49,8 +50,6 @@ def register_user(username, password, email, first_name, last_name, confirm_pass
             last_name=last_name,
             is_active=True
         )
-        user.set_password(password)
-        user.save()
         # UserUtils.send_email(request, mail_subject='Activate your account',
         #                      template_path='account_activation_template.html', user=user, receiver=email)
         return user
@@ -78,6 +77,7 @@ def get_user_data(user_id):
         ValidationError: If no user with the given ID exists or other retrieval error occurs.
     """
     try:
+        from api_logic.serializers import UserSerializer
         user = User.objects.get(id=user_id)
         serializer = UserSerializer(user)
         return serializer.data
@@ -87,7 +87,35 @@ def get_user_data(user_id):
         raise ValidationError(f"Failed to retrieve user: {str(e)}")
 
 
-def login_user(request, username, password):
+def login_user(request, username, password, create_session=None):
+    """
+    Authenticates a user and issues a new knox token.
+
+    By default (`API_TOKEN_ONLY_LOGIN = True`) no Django session is created:
+    the API authenticates with the token alone, so writing a `django_session`
+    row and setting a cookie on every login is wasted work. `last_login` is
+    still updated through the `user_logged_in` signal.
+
+    Password checking goes through `authenticate`, so a stored hash made
+    with another algorithm or cost than the configured PASSWORD_HASHER is
+    re-hashed and saved on success.
+
+    Args:
+        request (HttpRequest): The current request.
+        username (str): The username.
+        password (str): The password.
+        create_session (bool | None): Also log the user into a Django session.
+            Defaults to `not settings.API_TOKEN_ONLY_LOGIN`.
+
+    Returns:
+        dict: The username and the raw token.
+
+    Raises:
+        ValidationError: If the credentials are invalid or the device limit is reached.
+    """
+    if create_session is None:
+        create_session = not getattr(settings, 'API_TOKEN_ONLY_LOGIN', True)
+
     if not username or not password:
         raise ValidationError("Username and password are required.")
 
@@ -105,13 +133,16 @@ def login_user(request, username, password):
     if not flag:
         raise ValidationError("The provided credentials are invalid.")
 
-    logged_devices = AuthToken.objects.filter(user=user).count()
+    logged_devices = count_active_tokens(user)
     if logged_devices >= 5:
         raise ValidationError(
             "Maximum number of devices logged in. Please log out from another device.")
 
     token = AuthToken.objects.create(user)
-    login(request, flag)
+    if create_session:
+        login(request, flag)
+    else:
+        user_logged_in.send(sender=flag.__class__, request=request, user=flag)
 
     return {'username': user.username, 'token': token[1]}
 
@@ -189,6 +220,7 @@ def get_all_users():
         ValidationError: If there is an error retrieving users.
     """
     try:
+        from api_logic.serializers import UserSerializer
         users = User.objects.all()
         serializer = UserSerializer(users, many=True)
         return serializer.data
@@ -0,0 +1,146 @@
+import logging
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import ValidationError
+from api_logic.renderers import json_dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_REQUESTS = 20
+ALLOWED_METHODS = ('GET',)
+# Validators of the batch request must not turn its sub-requests into 304s.
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def _resolve(path):
+    """Resolves `path` to an api_logic class-based view, or raises ValidationError."""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        raise ValidationError(f"No route matches '{path}'.")
+    view_class = getattr(match.func, 'view_class', None)
+    if (view_class is None or not view_class.__module__.startswith('api_logic.')
+            or getattr(view_class, 'batchable', True) is False):
+        raise ValidationError(f"'{path}' cannot be used in a batch.")
+    return match
+
+
+def _parse(items):
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', DEFAULT_MAX_REQUESTS)
+    if not isinstance(items, list) or not items:
+        raise ValidationError("'requests' must be a non-empty list.")
+    if len(items) > max_requests:
+        raise ValidationError(f"A batch can hold at most {max_requests} requests.")
+
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            raise ValidationError("Each request needs a 'path'.")
+        method = str(item.get('method', 'GET')).upper()
+        if method not in ALLOWED_METHODS:
+            raise ValidationError(f"Only {', '.join(ALLOWED_METHODS)} requests can be batched.")
+        url = urlsplit(item['path'])
+        parsed.append((item['path'], method, url.path, url.query, _resolve(url.path)))
+    return parsed
+
+
+def _sub_request(request, method, path, query):
+    """
+    Builds the request handed to a sub-view.
+
+    The batch caller is already authenticated, so the user and token are
+    forced onto the sub-request (DRF then skips its authenticators) instead
+    of repeating the knox lookup for every entry.
+    """
+    django_request = request._request
+    sub_request = HttpRequest()
+    sub_request.method = method
+    sub_request.path = sub_request.path_info = path
+    meta = {
+        key: value for key, value in django_request.META.items()
+        if key not in CONDITIONAL_HEADERS
+    }
+    sub_request.META = {
+        **meta,
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_LENGTH': '0',
+    }
+    sub_request.GET = QueryDict(query)
+    sub_request.COOKIES = django_request.COOKIES
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _body(response):
+    """Returns the sub-response body as JSON bytes, reusing JSON content as is."""
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    content = response.content
+    if not content:
+        return b'null'
+    if response.get('Content-Type', '').startswith('application/json'):
+        return content
+    return json_dumps(content.decode(response.charset, errors='replace'))
+
+
+def _run_entry(request, method, path, query, match):
+    """
+    Runs one sub-request and returns (status, body bytes).
+
+    Each entry runs in a savepoint, so an entry that raises, even with a
+    database error, becomes a 500 entry and the rest of the batch still
+    runs on a usable transaction.
+    """
+    try:
+        with transaction.atomic():
+            response = match.func(_sub_request(request, method, path, query), *match.args, **match.kwargs)
+            return response.status_code, _body(response)
+    except Exception:
+        logger.exception("Batch entry %s %s failed", method, path)
+        return 500, json_dumps({'detail': 'Internal server error.'})
+
+
+def execute_batch(request, items):
+    """
+    Runs read-only sub-requests against api_logic routes for an
+    authenticated DRF `request` and returns the combined JSON body.
+
+    All entries run on this request's DB connection inside one transaction;
+    on PostgreSQL it is REPEATABLE READ and READ ONLY, so every entry sees
+    the same snapshot. Entries run one after another: Django connections are
+    per thread, so running them in parallel would mean one connection and
+    one snapshot each, which costs more than these millisecond reads.
+
+    Args:
+        request (Request): The authenticated batch request.
+        items (list[dict]): Entries with a `path` (may include a query
+            string) and an optional `method` (GET only).
+
+    Returns:
+        bytes: `{"responses": [{"path", "status", "body"}, ...]}` in request
+        order; an entry whose view raised has status 500.
+
+    Raises:
+        ValidationError: If the batch or an entry is invalid.
+    """
+    parsed = _parse(items)
+    parts = []
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        for original, method, path, query, match in parsed:
+            status, body = _run_entry(request, method, path, query, match)
+            # Sub-responses are already JSON; splice them in rather than
+            # decoding and re-encoding every body.
+            parts.append(
+                b'{"path":' + json_dumps(original) + b',"status":' + str(status).encode()
+                + b',"body":' + body + b'}')
+    return b'{"responses":[' + b','.join(parts) + b']}'
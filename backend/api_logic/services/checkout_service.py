@@ -0,0 +1,177 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.utils import timezone
+from api_logic.models import PendingCheckout
+
+# A session this close to its expiry is not handed out again; the client
+# would barely have time to complete the payment.
+REUSE_MARGIN = timedelta(minutes=5)
+
+# How long a request may spend creating a session before another request
+# is allowed to take over, and how often waiting requests re-check.
+CLAIM_TIMEOUT = timedelta(seconds=60)
+POLL_INTERVAL = 0.25
+# How long a request waits for another one's session before giving up with
+# CheckoutInProgress; kept short so a slow Stripe call does not tie up the
+# waiting workers.
+CLAIM_WAIT = timedelta(seconds=5)
+
+
+class CheckoutInProgress(Exception):
+    """Another request is still creating this checkout session; retry shortly."""
+
+
+class SharedCallError(Exception):
+    """Raised in each caller that waited on a failed `SingleFlight` call.
+
+    The leader's exception is the `__cause__`; every waiter gets its own
+    instance, so no traceback or context is shared between threads.
+    """
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block and receive the same result, or a SharedCallError
+    chained to the leader's exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise SharedCallError(f"Shared call for {key!r} failed: {call.error!r}") from call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+_checkout_flight = SingleFlight()
+
+
+def _is_reusable(pending, now):
+    return bool(
+        pending.checkout_url
+        and pending.expires_at
+        and pending.expires_at - REUSE_MARGIN > now
+    )
+
+
+def _claim(user, subscription_plan):
+    """
+    Returns the reusable checkout URL, or claims the right to create one.
+
+    Runs in a short transaction of its own.
+
+    Returns:
+        tuple[str | None, bool]: (url, claimed). Neither is set while
+        another request holds an unexpired claim.
+    """
+    with transaction.atomic():
+        pending = PendingCheckout.objects.select_for_update().get(
+            user=user, subscription_id=subscription_plan.pk)
+        now = timezone.now()
+        if _is_reusable(pending, now):
+            return pending.checkout_url, False
+        if pending.claimed_until and pending.claimed_until > now:
+            return None, False
+        pending.claimed_until = now + CLAIM_TIMEOUT
+        pending.save(update_fields=['claimed_until', 'updated_at'])
+        return None, True
+
+
+def get_or_create_checkout(user, subscription_plan, create_session):
+    """
+    Returns the checkout URL for `user` and `subscription_plan`, reusing an
+    open Checkout Session when one is still inside its expiry window.
+
+    Concurrent requests for the same pair share one in-flight Stripe call
+    within a process. Across processes, the first request claims the
+    PendingCheckout row (`claimed_until`) and calls Stripe outside any
+    transaction; later requests poll for up to CLAIM_WAIT until the session
+    is stored and reuse it, or take over once the claim expires.
+
+    Args:
+        user (User): The subscribing user.
+        subscription_plan (CatalogPlan): The requested plan.
+        create_session (callable): Creates a Stripe Checkout Session and
+            returns it; only called when no reusable session exists.
+
+    Returns:
+        str: The checkout URL.
+
+    Raises:
+        CheckoutInProgress: Another request still holds the claim after
+            CLAIM_WAIT.
+    """
+    def _load_or_create():
+        PendingCheckout.objects.get_or_create(
+            user=user, subscription_id=subscription_plan.pk)
+        deadline = time.monotonic() + CLAIM_WAIT.total_seconds()
+        while True:
+            url, claimed = _claim(user, subscription_plan)
+            if url:
+                return url
+            if claimed:
+                break
+            if time.monotonic() >= deadline:
+                raise CheckoutInProgress("A checkout session for this plan is being created.")
+            time.sleep(POLL_INTERVAL)
+
+        pending = PendingCheckout.objects.filter(
+            user=user, subscription_id=subscription_plan.pk)
+        try:
+            session = create_session()
+        except BaseException:
+            pending.update(claimed_until=None, updated_at=timezone.now())
+            raise
+        pending.update(
+            stripe_session_id=session.id,
+            checkout_url=session.url,
+            expires_at=datetime.fromtimestamp(session.expires_at, tz=dt_timezone.utc),
+            claimed_until=None,
+            updated_at=timezone.now(),
+        )
+        return session.url
+
+    try:
+        return _checkout_flight.do((user.pk, subscription_plan.pk), _load_or_create)
+    except SharedCallError as e:
+        if isinstance(e.__cause__, CheckoutInProgress):
+            raise CheckoutInProgress(str(e.__cause__)) from e
+        raise
+
+
+def clear_pending_checkout(user, subscription_plan):
+    """Drops the stored session once the checkout has completed."""
+    PendingCheckout.objects.filter(
+        user=user, subscription_id=subscription_plan.pk).delete()
@@ -0,0 +1,118 @@
+import struct
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from api_logic.models import UserSubscription
+
+CACHE_PREFIX = 'entitlement:'
+DEFAULT_CACHE_TTL = 60
+DEFAULT_BATCH_LIMIT = 5000
+
+# Cached marker for "no active subscription", so misses are cached too.
+_NONE = 0
+
+_BINARY_RECORD = struct.Struct('<qq')
+
+
+def _cache_key(user_id):
+    return f"{CACHE_PREFIX}{user_id}"
+
+
+def _cache_ttl():
+    """
+    ENTITLEMENT_CACHE_TTL, or 0 when the default cache is process-local.
+
+    Invalidation on subscription changes deletes keys in the cache of the
+    process that made the change; a LocMemCache in every other worker would
+    keep serving the old answer until the TTL ran out.
+    """
+    if isinstance(caches['default'], LocMemCache):
+        return 0
+    return getattr(settings, 'ENTITLEMENT_CACHE_TTL', DEFAULT_CACHE_TTL)
+
+
+def _query_active_until(user_ids):
+    """One indexed query for the latest active `current_period_end` per user."""
+    if connection.vendor == 'postgresql':
+        table = UserSubscription._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT user_id, MAX(current_period_end) FROM {table} "
+                f"WHERE is_active AND user_id = ANY(%s) GROUP BY user_id",
+                [list(user_ids)],
+            )
+            return dict(cursor.fetchall())
+
+    active_until = {}
+    rows = UserSubscription.objects.filter(
+        user_id__in=user_ids, is_active=True
+    ).values_list('user_id', 'current_period_end')
+    for user_id, period_end in rows:
+        if user_id not in active_until or period_end > active_until[user_id]:
+            active_until[user_id] = period_end
+    return active_until
+
+
+def get_active_until(user_ids):
+    """
+    Returns when paid access ends for each user, or None if they have none.
+
+    Cached answers are served first; the remaining ids are resolved with a
+    single query and written back to the cache for ENTITLEMENT_CACHE_TTL seconds.
+    With a process-local cache backend every call goes to the database.
+
+    Args:
+        user_ids (Iterable[int]): The users to check.
+
+    Returns:
+        dict[int, datetime | None]
+    """
+    user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+    ttl = _cache_ttl()
+
+    cached = cache.get_many([_cache_key(user_id) for user_id in user_ids]) if ttl else {}
+    result = {}
+    missing = []
+    for user_id in user_ids:
+        value = cached.get(_cache_key(user_id))
+        if value is None:
+            missing.append(user_id)
+        else:
+            result[user_id] = (
+                None if value == _NONE else datetime.fromtimestamp(value, tz=dt_timezone.utc))
+
+    if missing:
+        found = _query_active_until(missing)
+        to_cache = {}
+        for user_id in missing:
+            period_end = found.get(user_id)
+            result[user_id] = period_end
+            to_cache[_cache_key(user_id)] = period_end.timestamp() if period_end else _NONE
+        if ttl:
+            cache.set_many(to_cache, ttl)
+
+    return result
+
+
+def invalidate_entitlements(user_ids):
+    """Drops cached entitlements once the surrounding transaction commits."""
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def to_ndjson(active_until):
+    from api_logic.renderers import json_dumps
+    return b''.join(
+        json_dumps({'user_id': user_id, 'active_until': period_end}) + b'\n'
+        for user_id, period_end in active_until.items()
+    )
+
+
+def to_binary(active_until):
+    """Packs each user as two little-endian int64: user id, unix seconds (0 = none)."""
+    return b''.join(
+        _BINARY_RECORD.pack(user_id, int(period_end.timestamp()) if period_end else 0)
+        for user_id, period_end in active_until.items()
+    )
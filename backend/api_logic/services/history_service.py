@@ -0,0 +1,226 @@
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from api_logic.models import UserSubscription, UserSubscriptionHistory
+from api_logic.services.outbox_service import SUBSCRIPTION_ACTIVATED, SUBSCRIPTION_CANCELLED
+
+HISTORY_TABLE = UserSubscriptionHistory._meta.db_table
+# pg_advisory_xact_lock key serializing partition creation.
+PARTITION_LOCK_KEY = 0x686973746F7279
+
+
+def _history_row(user_subscription, change, at):
+    return UserSubscriptionHistory(
+        user_subscription_id=user_subscription.id,
+        user_id=user_subscription.user_id,
+        subscription_id=user_subscription.subscription_id,
+        stripe_subscription_id=user_subscription.stripe_subscription_id,
+        change=change,
+        is_active=user_subscription.is_active,
+        current_period_end=user_subscription.current_period_end,
+        cancelled_at=user_subscription.cancelled_at,
+        valid_from=at or timezone.now(),
+    )
+
+
+def record_subscription_history(user_subscription, change, at=None):
+    """
+    Appends the current state of `user_subscription` to the history table.
+
+    Call it inside the transaction that changes the live row so both are
+    committed together.
+    """
+    row = _history_row(user_subscription, change, at)
+    row.save(force_insert=True)
+    return row
+
+
+def record_subscription_history_bulk(user_subscriptions, change, at=None):
+    """Bulk variant of `record_subscription_history` (one INSERT for all rows)."""
+    at = at or timezone.now()
+    return UserSubscriptionHistory.objects.bulk_create(
+        [_history_row(user_subscription, change, at) for user_subscription in user_subscriptions])
+
+
+def _latest_rows(at, **filters):
+    """
+    Ids of the latest row per `user_subscription_id` with `valid_from <= at`.
+
+    On PostgreSQL this is one DISTINCT ON pass in
+    (user_subscription_id, valid_from DESC) order over the rows up to `at`;
+    the `valid_from` bound prunes partitions for later months. Elsewhere a
+    correlated subquery picks the same rows.
+    """
+    rows = UserSubscriptionHistory.objects.filter(valid_from__lte=at, **filters)
+    if connection.vendor == 'postgresql':
+        return (
+            rows.order_by('user_subscription_id', '-valid_from', '-id')
+            .distinct('user_subscription_id')
+            .values('id')
+        )
+    latest = (
+        UserSubscriptionHistory.objects
+        .filter(user_subscription_id=OuterRef('user_subscription_id'), valid_from__lte=at)
+        .order_by('-valid_from', '-id')
+        .values('id')[:1]
+    )
+    return rows.filter(id=Subquery(latest)).values('id')
+
+
+def states_as_of(at, subscription_id=None):
+    """
+    Returns the history rows describing each subscription as it was at `at`.
+
+    Args:
+        at (datetime): The point in time.
+        subscription_id (int | None): Restrict to one plan.
+
+    Returns:
+        QuerySet[UserSubscriptionHistory]
+    """
+    filters = {} if subscription_id is None else {'subscription_id': subscription_id}
+    return UserSubscriptionHistory.objects.filter(
+        valid_from__lte=at, id__in=_latest_rows(at, **filters))
+
+
+def subscribers_as_of(at, subscription_id=None):
+    """Returns the ids of users with an active subscription at `at`."""
+    return list(
+        states_as_of(at, subscription_id)
+        .filter(is_active=True)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+
+
+def user_subscription_as_of(user_id, at):
+    """Returns the user's active history row at `at`, or None."""
+    return (
+        UserSubscriptionHistory.objects
+        .filter(valid_from__lte=at, is_active=True, id__in=_latest_rows(at, user_id=user_id))
+        .order_by('-valid_from', '-id')
+        .first()
+    )
+
+
+def _month_start(year, month):
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def _add_months(year, month, months):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def _create_partition(cursor, name, start, end):
+    """
+    Creates the partition for [start, end) unless it exists, and reports
+    whether it did.
+
+    Runs in a transaction holding PARTITION_LOCK_KEY, so concurrent callers
+    create each month once; `IF NOT EXISTS` also covers tables made by other
+    means. Rows the DEFAULT partition took for that range while it did not
+    exist would make the CREATE fail, so in that case DEFAULT is detached,
+    its matching rows are moved into the new partition and DEFAULT is
+    attached again.
+    """
+    default = f"{HISTORY_TABLE}_default"
+    with transaction.atomic():
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [PARTITION_LOCK_KEY])
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0]:
+            return False
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default} WHERE valid_from >= %s AND valid_from < %s)",
+            [start, end])
+        misplaced = cursor.fetchone()[0]
+        if misplaced:
+            cursor.execute(f"ALTER TABLE {HISTORY_TABLE} DETACH PARTITION {default}")
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, end])
+        if misplaced:
+            cursor.execute(
+                f"INSERT INTO {name} SELECT * FROM {default} WHERE valid_from >= %s AND valid_from < %s",
+                [start, end])
+            cursor.execute(
+                f"DELETE FROM {default} WHERE valid_from >= %s AND valid_from < %s", [start, end])
+            cursor.execute(f"ALTER TABLE {HISTORY_TABLE} ATTACH PARTITION {default} DEFAULT")
+    return True
+
+
+def ensure_history_partitions(months_ahead=3, now=None):
+    """
+    Creates monthly partitions of the history table from the current month
+    up to `months_ahead` months ahead. Only applies to PostgreSQL.
+
+    Returns:
+        list[str]: Names of the partitions that were created.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+
+    now = now or timezone.now()
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            year, month = _add_months(now.year, now.month, offset)
+            next_year, next_month = _add_months(year, month, 1)
+            name = f"{HISTORY_TABLE}_p{year:04d}{month:02d}"
+            if _create_partition(cursor, name, _month_start(year, month), _month_start(next_year, next_month)):
+                created.append(name)
+    return created
+
+
+def _missing_history(user_subscriptions):
+    """
+    History rows a cancelled live row still needs before it can be removed:
+    its activation and its cancellation, for rows that reached the table
+    without going through `subscription_events` (e.g. bulk-loaded data).
+    """
+    recorded = set(
+        UserSubscriptionHistory.objects
+        .filter(user_subscription_id__in=[row.id for row in user_subscriptions])
+        .values_list('user_subscription_id', 'is_active')
+    )
+    rows = []
+    for user_subscription in user_subscriptions:
+        if (user_subscription.id, True) not in recorded:
+            row = _history_row(user_subscription, SUBSCRIPTION_ACTIVATED, user_subscription.created_at)
+            row.is_active = True
+            row.cancelled_at = None
+            rows.append(row)
+        if (user_subscription.id, False) not in recorded:
+            rows.append(_history_row(
+                user_subscription, SUBSCRIPTION_CANCELLED, user_subscription.cancelled_at))
+    return rows
+
+
+def archive_inactive_subscriptions(older_than, batch_size=1000):
+    """
+    Deletes cancelled live rows whose cancellation is older than `older_than`.
+
+    Their lifecycle stays in the history table: in the same transaction
+    as the delete, any activation or cancellation a row has no history for
+    yet is appended first, so as-of queries answer the same afterwards.
+    The live table only has to hold current and recently cancelled
+    subscriptions.
+
+    Returns:
+        int: Number of rows removed from the live table.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            user_subscriptions = list(
+                UserSubscription.objects
+                .filter(is_active=False, cancelled_at__lt=older_than)
+                .order_by()[:batch_size]
+            )
+            if not user_subscriptions:
+                return deleted
+            UserSubscriptionHistory.objects.bulk_create(_missing_history(user_subscriptions))
+            UserSubscription.objects.filter(id__in=[row.id for row in user_subscriptions]).delete()
+        deleted += len(user_subscriptions)
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'subscription_events'
+QUEUE_SIZE = 16
+
+
+class LocalBroker(object):
+    """In-process fan-out of per-user messages to asyncio subscribers.
+
+    Each subscriber is an `asyncio.Queue` bound to the event loop that
+    created it; publishing is thread-safe, so sync views and worker threads
+    can publish while the ASGI loop serves the streams. An idle subscriber
+    costs one small queue and no thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        return entry
+
+    def unsubscribe(self, user_id, entry):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def dispatch(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._subscribers.values())
+
+
+def _offer(queue, message):
+    # A client that stopped reading must not grow memory; drop its oldest message.
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+class LocalBackend(object):
+    """Delivers messages to subscribers of this process only, after commit."""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def publish(self, user_id, message):
+        transaction.on_commit(lambda: self.broker.dispatch(user_id, message))
+
+    def start(self):
+        pass
+
+
+class PostgresBackend(object):
+    """Cross-process delivery through PostgreSQL LISTEN/NOTIFY.
+
+    `pg_notify` runs inside the publishing transaction, so PostgreSQL only
+    delivers it on commit. Each process runs one listener thread with its
+    own connection and hands notifications to the local broker.
+    """
+
+    def __init__(self, broker, channel=PG_CHANNEL):
+        self.broker = broker
+        self.channel = channel
+        self._started = False
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, message):
+        payload = json.dumps({'user_id': user_id, 'message': message}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen_forever, name='pg-listen', daemon=True).start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("LISTEN connection lost; reconnecting")
+                threading.Event().wait(1)
+
+    def _listen(self):
+        wrapper = connections.create_connection('default')
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        raw.autocommit = True
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            while True:
+                if select.select([raw], [], [], 30) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    notify = raw.notifies.pop(0)
+                    data = json.loads(notify.payload)
+                    self.broker.dispatch(data['user_id'], data['message'])
+        finally:
+            wrapper.close()
+
+
+broker = LocalBroker()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = getattr(settings, 'NOTIFICATION_BACKEND', 'local')
+            _backend = PostgresBackend(broker) if name == 'postgres' else LocalBackend(broker)
+        return _backend
+
+
+def notify_user(user_id, event_type, data, event_id=None):
+    """
+    Publishes an event for `user_id`; delivered to open streams once the
+    transaction commits. `event_id` is the matching OutboxEvent id, sent as
+    the SSE `id:` so a reconnecting client can resume after it.
+    """
+    get_backend().publish(user_id, {'id': event_id, 'type': event_type, 'data': data})
@@ -0,0 +1,234 @@
+import json
+import logging
+import time
+import urllib.request
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from api_logic.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_ACTIVATED = 'subscription.activated'
+SUBSCRIPTION_CANCELLED = 'subscription.cancelled'
+SUBSCRIPTION_EXTENDED = 'subscription.extended'
+
+DEFAULT_RELAY_BATCH_SIZE = 500
+
+# pg_advisory_xact_lock key serializing position assignment across relays.
+POSITION_LOCK_KEY = 0x6F7574626F78
+DEFAULT_FEED_LIMIT = 100
+MAX_FEED_LIMIT = 1000
+
+
+def subscription_payload(user_subscription):
+    return {
+        'user_subscription_id': user_subscription.id,
+        'user_id': user_subscription.user_id,
+        'subscription_id': user_subscription.subscription_id,
+        'stripe_subscription_id': user_subscription.stripe_subscription_id,
+        'is_active': user_subscription.is_active,
+        'current_period_end': user_subscription.current_period_end,
+        'cancelled_at': user_subscription.cancelled_at,
+    }
+
+
+def record_subscription_event(user_subscription, event_type):
+    """
+    Adds a subscription change to the outbox.
+
+    Must be called inside the transaction that performs the change, so the
+    event is committed (or rolled back) together with it.
+    """
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        user_id=user_subscription.user_id,
+        payload=subscription_payload(user_subscription),
+    )
+
+
+def record_subscription_events(user_subscriptions, event_type):
+    """Bulk variant of `record_subscription_event` (one INSERT for all rows)."""
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            event_type=event_type,
+            user_id=user_subscription.user_id,
+            payload=subscription_payload(user_subscription),
+        )
+        for user_subscription in user_subscriptions
+    ])
+
+
+def serialize_event(event):
+    return {
+        'id': event.id,
+        'position': event.position,
+        'type': event.event_type,
+        'user_id': event.user_id,
+        'payload': event.payload,
+        'created_at': event.created_at,
+    }
+
+
+def user_events_after(user_id, last_id, limit):
+    """
+    Returns up to `limit` outbox events of one user with an id above
+    `last_id`, oldest first, for replaying to a reconnecting stream.
+    """
+    return list(
+        OutboxEvent.objects.filter(user_id=user_id, id__gt=last_id).order_by('id')[:limit]
+    )
+
+
+def get_changes(since=0, limit=DEFAULT_FEED_LIMIT):
+    """
+    Returns outbox events with a position greater than `since`, oldest
+    first.
+
+    Positions are assigned by the relay in commit order without gaps, so a
+    consumer that advances its cursor never skips an event that was still
+    uncommitted when it read (which paging on `id` would). Events appear in
+    the feed once the relay has numbered them.
+
+    Args:
+        since (int): Cursor returned by the previous call (0 to start).
+        limit (int): Maximum number of events, capped at MAX_FEED_LIMIT.
+
+    Returns:
+        dict: `events` and `next_cursor`, the cursor for the next call.
+    """
+    limit = max(1, min(limit, MAX_FEED_LIMIT))
+    events = [
+        serialize_event(event)
+        for event in OutboxEvent.objects.filter(position__gt=since).order_by('position')[:limit]
+    ]
+    return {
+        'events': events,
+        'next_cursor': events[-1]['position'] if events else since,
+    }
+
+
+class NDJSONFileSink(object):
+    """Appends each event as one JSON line to a local file."""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'OUTBOX_FILE_PATH', 'outbox.ndjson')
+
+    def publish(self, events):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, cls=DjangoJSONEncoder))
+                f.write('\n')
+
+
+class HTTPSink(object):
+    """POSTs each batch as an NDJSON body; any non-2xx response fails the batch."""
+
+    def __init__(self, url=None, timeout=10, headers=None):
+        self.url = url or getattr(settings, 'OUTBOX_HTTP_URL', '')
+        self.timeout = timeout
+        self.headers = headers or getattr(settings, 'OUTBOX_HTTP_HEADERS', {})
+        if not self.url:
+            raise ValueError("OUTBOX_HTTP_URL is not configured.")
+
+    def publish(self, events):
+        body = ''.join(json.dumps(event, cls=DjangoJSONEncoder) + '\n' for event in events)
+        request = urllib.request.Request(
+            self.url, data=body.encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/x-ndjson', **self.headers})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise IOError(f"Outbox sink returned HTTP {response.status}")
+
+
+SINKS = {
+    'file': NDJSONFileSink,
+    'http': HTTPSink,
+}
+
+
+def get_sink(name=None):
+    """Builds the sink named by `name` or `settings.OUTBOX_SINK` ('file', 'http' or a dotted path)."""
+    name = name or getattr(settings, 'OUTBOX_SINK', 'file')
+    sink_class = SINKS.get(name) or import_string(name)
+    return sink_class()
+
+
+def _lock_positions():
+    # Positions must become visible in the order they are handed out, so one
+    # relay at a time assigns and commits them. Other backends already
+    # serialize writers.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [POSITION_LOCK_KEY])
+
+
+def _assign_positions(batch_size):
+    """
+    Numbers up to `batch_size` events that have no position yet with the
+    next feed positions, in one short transaction.
+
+    Relays take a transaction-scoped lock here, so batches are numbered and
+    committed one after another and positions are gap-free in commit order.
+    Nothing slow runs while the lock is held.
+    """
+    with transaction.atomic():
+        _lock_positions()
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(position__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return
+        last = OutboxEvent.objects.aggregate(last=Max('position'))['last'] or 0
+        for offset, event in enumerate(events, 1):
+            event.position = last + offset
+        OutboxEvent.objects.bulk_update(events, ['position'])
+
+
+def relay_batch(sink, batch_size=DEFAULT_RELAY_BATCH_SIZE):
+    """
+    Numbers new events, then publishes one batch of numbered but
+    unpublished events to `sink` and marks them as published.
+
+    The sink is called after the numbering transaction has committed, so a
+    slow or failing sink holds no lock and blocks no outbox writer. If it
+    fails, the events stay unpublished and are sent again on the next call
+    (delivery is at-least-once).
+
+    Returns:
+        int: Number of events published.
+    """
+    _assign_positions(batch_size)
+    events = list(
+        OutboxEvent.objects.filter(published_at__isnull=True, position__isnull=False)
+        .order_by('position')[:batch_size]
+    )
+    if not events:
+        return 0
+    sink.publish([serialize_event(event) for event in events])
+    OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(published_at=timezone.now())
+    return len(events)
+
+
+def run_relay(sink, batch_size=DEFAULT_RELAY_BATCH_SIZE, interval=1.0, once=False):
+    """Relays batches until the outbox is drained (`once`) or forever, sleeping `interval` when idle."""
+    total = 0
+    while True:
+        try:
+            published = relay_batch(sink, batch_size)
+        except Exception:
+            if once:
+                raise
+            logger.exception("Outbox relay batch failed")
+            published = 0
+        total += published
+        if published:
+            continue
+        if once:
+            return total
+        time.sleep(interval)
@@ -0,0 +1,141 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from types import MappingProxyType
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from api_logic.models import Subscription, PlanCatalogVersion
+
+CATALOG_VERSION_PK = 1
+DEFAULT_CHECK_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class CatalogPlan:
+    """Read-only copy of a `Subscription` row as held in the catalog snapshot."""
+    id: int
+    name: str
+    price: Decimal
+    interval: str
+    created_at: datetime
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of every plan at one catalog version, with the pre-rendered JSON body."""
+    version: int
+    plans: tuple
+    by_id: MappingProxyType
+    by_name: MappingProxyType
+    body: bytes
+
+    @property
+    def etag(self):
+        return f'"plans-v{self.version}"'
+
+
+def current_version():
+    """
+    Returns the catalog version stored in the database, 0 before the first
+    plan change. Read-only, so it is safe inside READ ONLY transactions.
+    """
+    version = (
+        PlanCatalogVersion.objects.filter(pk=CATALOG_VERSION_PK)
+        .values_list('version', flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def bump_version():
+    """Increments the catalog version; call inside the transaction that changed a plan."""
+    updated = PlanCatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(
+        version=F('version') + 1)
+    if not updated:
+        PlanCatalogVersion.objects.get_or_create(
+            pk=CATALOG_VERSION_PK, defaults={'version': 1})
+
+
+def build_snapshot(version):
+    """Loads every plan and freezes it into a CatalogSnapshot tagged with `version`."""
+    from api_logic.renderers import json_dumps
+    from api_logic.serializers import SubscriptionSerializer
+
+    rows = list(Subscription.objects.order_by('price', 'id'))
+    plans = tuple(
+        CatalogPlan(id=row.id, name=row.name, price=row.price,
+                    interval=row.interval, created_at=row.created_at)
+        for row in rows
+    )
+    return CatalogSnapshot(
+        version=version,
+        plans=plans,
+        by_id=MappingProxyType({plan.id: plan for plan in plans}),
+        by_name=MappingProxyType({plan.name: plan for plan in plans}),
+        body=json_dumps(SubscriptionSerializer(rows, many=True).data),
+    )
+
+
+class PlanCatalog(object):
+    """Process-wide plan catalog served from an immutable snapshot.
+
+    Local plan changes drop the snapshot through signals. Changes made by
+    other processes are picked up by comparing the snapshot version with
+    `PlanCatalogVersion` at most once every `PLAN_CATALOG_CHECK_INTERVAL`
+    seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'PLAN_CATALOG_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+            version = current_version()
+            if snapshot is None or snapshot.version != version:
+                snapshot = build_snapshot(version)
+                self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def get_by_id(self, plan_id):
+        try:
+            plan_id = int(plan_id)
+        except (TypeError, ValueError):
+            return None
+        return self.snapshot().by_id.get(plan_id)
+
+    def get_by_name(self, name):
+        return self.snapshot().by_name.get(name)
+
+
+plan_catalog = PlanCatalog()
+
+
+def on_plan_changed():
+    """Signal hook: bumps the shared version and drops the local snapshot after commit."""
+    bump_version()
+    transaction.on_commit(plan_catalog.invalidate)
@@ -0,0 +1,262 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from api_logic.models import DailySubscriptionRollup, UserSubscription, UserSubscriptionHistory
+from api_logic.services.outbox_service import SUBSCRIPTION_ACTIVATED, SUBSCRIPTION_CANCELLED
+from api_logic.services.plan_catalog import plan_catalog
+
+# Billing interval -> multiplier that normalizes a price to one month.
+MONTHLY_FACTORS = {
+    'day': Decimal(365) / Decimal(12),
+    'week': Decimal(52) / Decimal(12),
+    'month': Decimal(1),
+    'year': Decimal(1) / Decimal(12),
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+TWO_PLACES = Decimal('0.01')
+
+
+def monthly_amount(plan):
+    """Returns the plan price normalized to one month (0 for an unknown plan)."""
+    if plan is None:
+        return Decimal(0)
+    factor = MONTHLY_FACTORS.get(plan.interval, Decimal(1))
+    return (Decimal(plan.price) * factor).quantize(TWO_PLACES)
+
+
+def apply_delta(day, subscription_id, new=0, churned=0, mrr_added=0, mrr_lost=0):
+    """Adds flows to the (day, plan) rollup row with a single UPDATE."""
+    DailySubscriptionRollup.objects.get_or_create(day=day, subscription_id=subscription_id)
+    DailySubscriptionRollup.objects.filter(day=day, subscription_id=subscription_id).update(
+        new_subscribers=F('new_subscribers') + new,
+        churned_subscribers=F('churned_subscribers') + churned,
+        mrr_added=F('mrr_added') + mrr_added,
+        mrr_lost=F('mrr_lost') + mrr_lost,
+    )
+
+
+def subscription_monthly_price(user_subscription):
+    """The monthly amount a subscription counts for: the price it started at,
+    or the plan's current price for rows that predate `monthly_price`."""
+    if user_subscription.monthly_price is not None:
+        return user_subscription.monthly_price
+    return monthly_amount(plan_catalog.get_by_id(user_subscription.subscription_id))
+
+
+def record_activation(user_subscription):
+    """Adds a new subscriber and stores the price it counts for on the row."""
+    if user_subscription.monthly_price is None:
+        user_subscription.monthly_price = monthly_amount(
+            plan_catalog.get_by_id(user_subscription.subscription_id))
+        UserSubscription.objects.filter(pk=user_subscription.pk).update(
+            monthly_price=user_subscription.monthly_price)
+    apply_delta(
+        timezone.localdate(user_subscription.created_at), user_subscription.subscription_id,
+        new=1, mrr_added=user_subscription.monthly_price)
+
+
+def record_cancellation(user_subscription):
+    apply_delta(
+        timezone.localdate(user_subscription.cancelled_at), user_subscription.subscription_id,
+        churned=1, mrr_lost=subscription_monthly_price(user_subscription))
+
+
+def record_cancellations(user_subscriptions):
+    """Bulk variant of `record_cancellation`: one UPDATE per (day, plan) group."""
+    groups = defaultdict(lambda: [0, Decimal(0)])
+    for user_subscription in user_subscriptions:
+        group = groups[(timezone.localdate(user_subscription.cancelled_at), user_subscription.subscription_id)]
+        group[0] += 1
+        group[1] += subscription_monthly_price(user_subscription)
+    for (day, subscription_id), (churned, mrr_lost) in groups.items():
+        apply_delta(day, subscription_id, churned=churned, mrr_lost=mrr_lost)
+
+
+def _iter_chunks(queryset, fields, chunk_size):
+    """Yields `fields` tuples in primary key order, one bounded query per chunk."""
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', *fields)[:chunk_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        for row in rows:
+            yield row[1:]
+
+
+def rollup_rows(plans, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Counts per-(day, plan) flows from the live subscriptions and, for rows
+    already archived out of the live table, from the subscription history.
+
+    Live rows count for their stored `monthly_price`; archived rows, whose
+    history has no price, for the plan's current one in both directions.
+    Source rows are read in primary key chunks; only the per-(day, plan)
+    counters are held in memory.
+
+    Returns:
+        dict[tuple[date, int], list]: (day, plan) -> [new, churned,
+        mrr_added, mrr_lost] for days in [start, end].
+    """
+    counters = defaultdict(lambda: [0, 0, Decimal(0), Decimal(0)])
+
+    def in_range(day):
+        return (start is None or day >= start) and (end is None or day <= end)
+
+    def add(moment, subscription_id, index, amount):
+        day = timezone.localdate(moment)
+        if not in_range(day):
+            return
+        counter = counters[(day, subscription_id)]
+        counter[index] += 1
+        counter[index + 2] += amount
+
+    live = UserSubscription.objects.all()
+    for subscription_id, created_at, cancelled_at, price in _iter_chunks(
+            live, ('subscription_id', 'created_at', 'cancelled_at', 'monthly_price'), chunk_size):
+        if price is None:
+            price = monthly_amount(plans.get(subscription_id))
+        add(created_at, subscription_id, 0, price)
+        if cancelled_at:
+            add(cancelled_at, subscription_id, 1, price)
+
+    archived = UserSubscriptionHistory.objects.filter(
+        change__in=[SUBSCRIPTION_ACTIVATED, SUBSCRIPTION_CANCELLED]
+    ).exclude(user_subscription_id__in=live.values('id'))
+    for subscription_id, change, valid_from in _iter_chunks(
+            archived, ('subscription_id', 'change', 'valid_from'), chunk_size):
+        add(valid_from, subscription_id, 0 if change == SUBSCRIPTION_ACTIVATED else 1,
+            monthly_amount(plans.get(subscription_id)))
+    return counters
+
+
+def _rollup_values(rows):
+    return {
+        (row.day, row.subscription_id): [
+            row.new_subscribers, row.churned_subscribers, row.mrr_added, row.mrr_lost]
+        for row in rows
+    }
+
+
+def _lock_rollups():
+    # Blocks `apply_delta` writers (not readers) until the swap commits.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {DailySubscriptionRollup._meta.db_table} IN EXCLUSIVE MODE")
+
+
+def _swap_day(day, counted, seen):
+    """
+    Replaces one day's rollup rows in a short transaction.
+
+    `counted` are the flows rebuilt from the sources and `seen` the rollup
+    values read in the same snapshot; whatever the live rows gained since
+    (subscription changes committed while the sources were read) is the
+    difference between the current values and `seen`, and is kept on top
+    of the rebuilt counts. The lock stops further deltas until the swap
+    commits.
+    """
+    with transaction.atomic():
+        _lock_rollups()
+        current = _rollup_values(DailySubscriptionRollup.objects.filter(day=day))
+        rows = []
+        for key in set(counted) | set(seen) | set(current):
+            values = [
+                value + now - before
+                for value, now, before in zip(
+                    counted.get(key, [0, 0, Decimal(0), Decimal(0)]),
+                    current.get(key, [0, 0, Decimal(0), Decimal(0)]),
+                    seen.get(key, [0, 0, Decimal(0), Decimal(0)]))
+            ]
+            if any(values):
+                rows.append(DailySubscriptionRollup(
+                    day=day, subscription_id=key[1], new_subscribers=values[0],
+                    churned_subscribers=values[1], mrr_added=values[2], mrr_lost=values[3]))
+        DailySubscriptionRollup.objects.filter(day=day).delete()
+        DailySubscriptionRollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def backfill_rollups(start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Rebuilds rollup rows for days in [start, end] (all days when both are
+    None) with `rollup_rows`.
+
+    The sources and the current rollups are read in one snapshot (a READ
+    ONLY, REPEATABLE READ transaction on PostgreSQL) that blocks no writer.
+    Each day is then swapped in by `_swap_day` in a transaction of its own,
+    which keeps the deltas subscription changes added in the meantime and
+    locks the rollup table only for that one day's swap.
+
+    Returns:
+        int: Number of rollup rows written.
+    """
+    plans = plan_catalog.snapshot().by_id
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if connection.vendor == 'postgresql' and outermost:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        counters = rollup_rows(plans, start=start, end=end, chunk_size=chunk_size)
+        existing = DailySubscriptionRollup.objects.all()
+        if start is not None:
+            existing = existing.filter(day__gte=start)
+        if end is not None:
+            existing = existing.filter(day__lte=end)
+        seen = _rollup_values(existing)
+
+    by_day = defaultdict(lambda: ({}, {}))
+    for key, values in counters.items():
+        by_day[key[0]][0][key] = values
+    for key, values in seen.items():
+        by_day[key[0]][1][key] = values
+    return sum(_swap_day(day, counted, before) for day, (counted, before) in sorted(by_day.items()))
+
+
+def get_report(start, end, subscription_id=None):
+    """
+    Returns daily active subscribers, new/churned counts, churn rate and MRR
+    for every day in [start, end], reading rollup rows only.
+    """
+    rollups = DailySubscriptionRollup.objects.all()
+    if subscription_id is not None:
+        rollups = rollups.filter(subscription_id=subscription_id)
+
+    sums = dict(
+        new=Sum('new_subscribers'), churned=Sum('churned_subscribers'),
+        added=Sum('mrr_added'), lost=Sum('mrr_lost'))
+    baseline = rollups.filter(day__lt=start).aggregate(**sums)
+    active = (baseline['new'] or 0) - (baseline['churned'] or 0)
+    mrr = (baseline['added'] or Decimal(0)) - (baseline['lost'] or Decimal(0))
+
+    per_day = {
+        row['day']: row
+        for row in rollups.filter(day__gte=start, day__lte=end)
+        .values('day').annotate(**sums).order_by('day')
+    }
+
+    report = []
+    day = start
+    while day <= end:
+        row = per_day.get(day, {})
+        new = row.get('new') or 0
+        churned = row.get('churned') or 0
+        opening = active
+        active += new - churned
+        mrr += (row.get('added') or Decimal(0)) - (row.get('lost') or Decimal(0))
+        report.append({
+            'day': day,
+            'active_subscribers': active,
+            'new_subscribers': new,
+            'churned_subscribers': churned,
+            'churn_rate': round(churned / opening, 4) if opening > 0 else 0.0,
+            'mrr': mrr.quantize(TWO_PLACES),
+        })
+        day += timedelta(days=1)
+    return report
@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import io
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from knox.settings import CONSTANTS, knox_settings
+from api_logic.models import Subscription, UserSubscription
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_PASSWORD = 'loadtest-password'
+NULL = r'\N'
+
+USER_COLUMNS = (
+    'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name',
+    'last_name', 'email', 'is_staff', 'is_active', 'date_joined')
+TOKEN_COLUMNS = ('digest', 'token_key', 'user_id', 'created', 'expiry')
+SUBSCRIPTION_COLUMNS = (
+    'user_id', 'subscription_id', 'stripe_subscription_id', 'is_active',
+    'current_period_end', 'cancelled_at', 'created_at', 'updated_at')
+
+
+def _bool(value):
+    return 't' if value else 'f'
+
+
+def _timestamp(value):
+    return value.isoformat() if value else NULL
+
+
+def copy_rows(table, columns, rows):
+    """
+    Streams `rows` into `table` with one COPY FROM STDIN (CSV format, NULL
+    written as \\N so empty strings stay empty strings).
+
+    Returns:
+        int: Number of rows copied.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    return count
+
+
+def _reset_sequence(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))", [table])
+
+
+class SyntheticDataGenerator(object):
+    """Deterministic users, knox tokens and subscriptions for load tests.
+
+    The same `seed` always yields the same users, tokens and plan choices;
+    timestamps are spread relative to `now`. Every user shares one password
+    hash computed up front, so generation costs no hashing per user.
+    """
+
+    def __init__(self, plan_ids, seed=0, prefix='loadtest', password=DEFAULT_PASSWORD,
+                 active_ratio=0.7, subscribed_ratio=0.9, min_devices=0, max_devices=3,
+                 history_days=365, now=None):
+        self.plan_ids = list(plan_ids)
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        salt = hashlib.sha256(f"{prefix}:{seed}".encode()).hexdigest()[:22]
+        self.password_hash = make_password(password, salt=salt)
+        self.active_ratio = active_ratio
+        self.subscribed_ratio = subscribed_ratio
+        self.min_devices = min_devices
+        self.max_devices = max_devices
+        self.history_days = history_days
+        self.now = now or timezone.now()
+        self.token_ttl = knox_settings.TOKEN_TTL
+        self.token_length = knox_settings.AUTH_TOKEN_CHARACTER_LENGTH
+
+    def _moment(self, days):
+        return self.now - timedelta(seconds=self.rng.randrange(max(1, int(days * 86400))))
+
+    def chunk(self, first_id, index, size):
+        """Returns (users, tokens, subscriptions) row lists for `size` users starting at `first_id`."""
+        users, tokens, subscriptions = [], [], []
+        rng = self.rng
+        for offset in range(size):
+            user_id = first_id + offset
+            username = f"{self.prefix}{index + offset:09d}"
+            joined = self._moment(self.history_days)
+            users.append((
+                user_id, self.password_hash, NULL, _bool(False), username, '', '',
+                f"{username}@example.com", _bool(False), _bool(True), _timestamp(joined)))
+
+            for _ in range(rng.randint(self.min_devices, self.max_devices)):
+                token = '%0*x' % (self.token_length, rng.getrandbits(self.token_length * 4))
+                created = self._moment(min(self.history_days, 30))
+                expiry = created + self.token_ttl if self.token_ttl else None
+                tokens.append((
+                    hash_token(token), token[:CONSTANTS.TOKEN_KEY_LENGTH], user_id,
+                    _timestamp(created), _timestamp(expiry)))
+
+            if self.plan_ids and rng.random() < self.subscribed_ratio:
+                created = self._moment((self.now - joined).days + 1)
+                active = rng.random() < self.active_ratio
+                period_end = self.now + timedelta(days=rng.randint(1, 30))
+                cancelled = None
+                if not active:
+                    cancelled = created + (self.now - created) * rng.random()
+                    period_end = cancelled
+                subscriptions.append((
+                    user_id, rng.choice(self.plan_ids), f"sub_{self.prefix}{user_id}",
+                    _bool(active), _timestamp(period_end), _timestamp(cancelled),
+                    _timestamp(created), _timestamp(cancelled or created)))
+        return users, tokens, subscriptions
+
+
+def seed(users, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, **options):
+    """
+    Inserts `users` synthetic users with their tokens and subscriptions via
+    COPY, one transaction per chunk. PostgreSQL only.
+
+    Rows bypass the ORM, so no signals fire and no outbox, history or
+    rollup rows are written; run `backfill_rollups` afterwards if reports
+    should include them.
+
+    Args:
+        users (int): Number of users to create.
+        chunk_size (int): Users per COPY round trip.
+        progress (callable | None): Called with the running totals after each chunk.
+        **options: Passed to `SyntheticDataGenerator`.
+
+    Returns:
+        dict: Row counts per table plus `seconds`.
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError("Seeding uses COPY and requires PostgreSQL.")
+    prefix = options.get('prefix', 'loadtest')
+    if User.objects.filter(username__startswith=prefix).exists():
+        raise ValueError(f"Users with the prefix '{prefix}' already exist; pick another --prefix.")
+
+    plan_ids = list(Subscription.objects.values_list('id', flat=True))
+    generator = SyntheticDataGenerator(plan_ids, **options)
+    user_table = User._meta.db_table
+    first_id = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+
+    totals = {'users': 0, 'tokens': 0, 'subscriptions': 0, 'seconds': 0.0}
+    started = time.perf_counter()
+    for index in range(0, users, chunk_size):
+        size = min(chunk_size, users - index)
+        user_rows, token_rows, subscription_rows = generator.chunk(first_id + index, index, size)
+        with transaction.atomic():
+            totals['users'] += copy_rows(user_table, USER_COLUMNS, user_rows)
+            totals['tokens'] += copy_rows(AuthToken._meta.db_table, TOKEN_COLUMNS, token_rows)
+            totals['subscriptions'] += copy_rows(
+                UserSubscription._meta.db_table, SUBSCRIPTION_COLUMNS, subscription_rows)
+        totals['seconds'] = time.perf_counter() - started
+        if progress:
+            progress(totals)
+
+    _reset_sequence(user_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {user_table}, {AuthToken._meta.db_table}, "
+                       f"{UserSubscription._meta.db_table}")
+    totals['seconds'] = time.perf_counter() - started
+    return totals
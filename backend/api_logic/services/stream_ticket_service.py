@@ -0,0 +1,51 @@
+import hashlib
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from api_logic.models import StreamTicket
+
+DEFAULT_TICKET_TTL = 30
+
+
+def _digest(ticket):
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def issue_ticket(user):
+    """
+    Creates a stream ticket for `user` valid for SSE_TICKET_TTL_SECONDS.
+
+    The user's expired tickets are removed on the way, so the table only
+    holds tickets that are still redeemable.
+
+    Returns:
+        tuple[str, int]: The ticket and its lifetime in seconds.
+    """
+    ttl = getattr(settings, 'SSE_TICKET_TTL_SECONDS', DEFAULT_TICKET_TTL)
+    now = timezone.now()
+    StreamTicket.objects.filter(user=user, expires_at__lte=now).delete()
+    ticket = secrets.token_urlsafe(32)
+    StreamTicket.objects.create(digest=_digest(ticket), user=user, expires_at=now + timedelta(seconds=ttl))
+    return ticket, ttl
+
+
+def redeem_ticket(ticket):
+    """
+    Consumes a stream ticket and returns its user, or None if the ticket is
+    unknown, expired or was redeemed already.
+
+    The row is deleted by primary key and only the request whose DELETE
+    removed it gets the user, so a ticket opens at most one stream even when
+    two requests race with it.
+    """
+    if not ticket:
+        return None
+    row = (
+        StreamTicket.objects.select_related('user')
+        .filter(digest=_digest(ticket), expires_at__gt=timezone.now())
+        .first()
+    )
+    if row is None or not StreamTicket.objects.filter(pk=row.pk).delete()[0]:
+        return None
+    return row.user if row.user.is_active else None
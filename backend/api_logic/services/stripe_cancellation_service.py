@@ -0,0 +1,149 @@
+import logging
+import time
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from api_logic.models import StripeCancellation
+from .stripe_client import get_stripe
+from .stripe_service import cancel_subscription_at_period_end
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+BASE_DELAY = timedelta(seconds=30)
+MAX_DELAY = timedelta(hours=6)
+# How long a claimed job is hidden from other workers. Must cover a whole
+# batch of Stripe calls; a worker that dies mid-batch frees its jobs after it.
+LEASE = timedelta(minutes=10)
+
+
+def enqueue_stripe_cancellation(user_subscription):
+    """
+    Queues the Stripe side of a cancellation.
+
+    Call inside the transaction that cancels the row, so the job exists if
+    and only if the cancellation was committed. Subscriptions that never
+    reached Stripe are skipped.
+    """
+    if not user_subscription.stripe_subscription_id:
+        return None
+    return StripeCancellation.objects.create(
+        user_subscription_id=user_subscription.id,
+        stripe_subscription_id=user_subscription.stripe_subscription_id,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def enqueue_stripe_cancellations(user_subscriptions):
+    """Bulk variant of `enqueue_stripe_cancellation` (one INSERT for all rows)."""
+    now = timezone.now()
+    return StripeCancellation.objects.bulk_create([
+        StripeCancellation(
+            user_subscription_id=user_subscription.id,
+            stripe_subscription_id=user_subscription.stripe_subscription_id,
+            next_attempt_at=now,
+        )
+        for user_subscription in user_subscriptions
+        if user_subscription.stripe_subscription_id
+    ])
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 1m, 2m, ... capped at MAX_DELAY."""
+    return min(BASE_DELAY * (2 ** (attempts - 1)), MAX_DELAY)
+
+
+def _is_permanent(error):
+    """Stripe rejected the request itself (e.g. the subscription no longer
+    exists); sending it again cannot succeed."""
+    return isinstance(error.__cause__, get_stripe().error.InvalidRequestError)
+
+
+def _error_message(error):
+    # The DRF ValidationError from stripe_service keeps its message in
+    # `detail`; str() of the exception would store the ErrorDetail repr.
+    detail = getattr(error, 'detail', None)
+    if isinstance(detail, list):
+        return ' '.join(str(item) for item in detail)
+    return str(detail if detail is not None else error)
+
+
+def _claim_jobs(batch_size, now):
+    """
+    Leases up to `batch_size` due jobs in one short transaction.
+
+    The rows are picked with SKIP LOCKED and their `next_attempt_at` is
+    pushed LEASE into the future, so other workers skip them after this
+    commits without any lock being held while Stripe is called. The attempt
+    is counted here, so a job whose worker dies still backs off.
+    """
+    with transaction.atomic():
+        jobs = list(
+            StripeCancellation.objects.select_for_update(skip_locked=True)
+            .filter(completed_at__isnull=True, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if jobs:
+            StripeCancellation.objects.filter(id__in=[job.id for job in jobs]).update(
+                attempts=F('attempts') + 1, next_attempt_at=now + LEASE)
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def process_batch(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Sends one batch of due cancellations to Stripe.
+
+    Jobs are claimed by `_claim_jobs`, so several workers can run side by
+    side and no transaction stays open across the Stripe calls. Each result
+    is written with its own single-row UPDATE. A failed call is rescheduled
+    with backoff; after MAX_ATTEMPTS, or at once when Stripe rejects the
+    request as invalid (e.g. an unknown subscription), the job is parked
+    (`next_attempt_at` cleared) with the last error kept.
+
+    Returns:
+        tuple[int, int]: Number of jobs completed and failed in this batch.
+    """
+    now = now or timezone.now()
+    completed = failed = 0
+    for job in _claim_jobs(batch_size, now):
+        try:
+            cancel_subscription_at_period_end(job.stripe_subscription_id)
+        except Exception as e:
+            failed += 1
+            message = _error_message(e)
+            if job.attempts >= MAX_ATTEMPTS or _is_permanent(e):
+                next_attempt_at = None
+                logger.error("Giving up on Stripe cancellation %s: %s",
+                             job.stripe_subscription_id, message)
+            else:
+                next_attempt_at = timezone.now() + retry_delay(job.attempts)
+            StripeCancellation.objects.filter(id=job.id).update(
+                next_attempt_at=next_attempt_at, last_error=message)
+        else:
+            completed += 1
+            StripeCancellation.objects.filter(id=job.id).update(
+                completed_at=timezone.now(), last_error='')
+    return completed, failed
+
+
+def run_worker(batch_size=DEFAULT_BATCH_SIZE, interval=5.0, once=False):
+    """Processes due jobs until none are left (`once`) or forever, sleeping `interval` when idle."""
+    total = 0
+    while True:
+        try:
+            completed, failed = process_batch(batch_size)
+        except Exception:
+            if once:
+                raise
+            logger.exception("Stripe cancellation batch failed")
+            completed = failed = 0
+        total += completed
+        if completed or failed:
+            continue
+        if once:
+            return total
+        time.sleep(interval)
@@ -0,0 +1,73 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_stripe = None
+
+# List collecting Stripe HTTP calls for the current request, or None when
+# nobody is recording (see `record_stripe_calls`).
+_recorded_calls = ContextVar('recorded_stripe_calls', default=None)
+
+
+def _instrument(client):
+    """Wraps the client's request method so calls can be recorded per request."""
+    request_with_retries = client.request_with_retries
+
+    def instrumented(method, url, *args, **kwargs):
+        calls = _recorded_calls.get()
+        if calls is None:
+            return request_with_retries(method, url, *args, **kwargs)
+        started = time.perf_counter()
+        status = None
+        try:
+            response = request_with_retries(method, url, *args, **kwargs)
+            status = response[1]
+            return response
+        finally:
+            calls.append({
+                'method': method.upper(),
+                'url': url,
+                'status': status,
+                'started': started,
+                'duration': time.perf_counter() - started,
+            })
+
+    client.request_with_retries = instrumented
+    return client
+
+
+def get_stripe():
+    """
+    Returns the configured `stripe` module, importing it on first use.
+
+    The SDK is only loaded when a request actually talks to Stripe, which
+    keeps it out of URLconf loading and worker start-up.
+    """
+    global _stripe
+    if _stripe is None:
+        import stripe
+        stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'test-key')
+        stripe.default_http_client = _instrument(stripe.new_default_http_client())
+        _stripe = stripe
+    return _stripe
+
+
+def reset_http_client():
+    """Closes the SDK's pooled connections and installs a fresh client, e.g. before forking."""
+    if _stripe is None:
+        return
+    client = _stripe.default_http_client
+    if client is not None and hasattr(client, 'close'):
+        client.close()
+    _stripe.default_http_client = _instrument(_stripe.new_default_http_client())
+
+@contextmanager
+def record_stripe_calls():
+    """Collects the Stripe HTTP calls made inside the block into the yielded list."""
+    calls = []
+    token = _recorded_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _recorded_calls.reset(token)
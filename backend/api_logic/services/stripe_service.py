@@ -1,11 +1,9 @@
-import os
-import stripe
 from rest_framework.exceptions import ValidationError
-
-stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'test-key')
+from .stripe_client import get_stripe
 
 
 def create_customer(user):
+    stripe = get_stripe()
     try:
         return stripe.Customer.create(
             email=user.email,
@@ -16,6 +14,7 @@ def create_customer(user):
 
 
 def create_product(name):
+    stripe = get_stripe()
     try:
         return stripe.Product.create(name=name)
     except stripe.error.StripeError as e:
@@ -23,6 +22,7 @@ def create_product(name):
 
 
 def create_price(unit_amount, currency, interval, product_id):
+    stripe = get_stripe()
     try:
         return stripe.Price.create(
             unit_amount=int(unit_amount * 100),
@@ -35,6 +35,7 @@ def create_price(unit_amount, currency, interval, product_id):
 
 
 def create_subscription(customer_id, price_id):
+    stripe = get_stripe()
     try:
         return stripe.Subscription.create(
             customer=customer_id,
@@ -45,6 +46,7 @@ def create_subscription(customer_id, price_id):
         raise ValidationError(f"Stripe error (create_subscription): {str(e)}")
 
 def create_checkout_session(customer_id, price_id, success_url, cancel_url):
+    stripe = get_stripe()
     try:
         session = stripe.checkout.Session.create(
             customer=customer_id,
@@ -59,3 +61,14 @@ def create_checkout_session(customer_id, price_id, success_url, cancel_url):
         return session
     except stripe.error.StripeError as e:
         raise ValidationError(f"Stripe error (create_checkout_session): {str(e)}")
+
+
+def cancel_subscription_at_period_end(stripe_subscription_id):
+    stripe = get_stripe()
+    try:
+        return stripe.Subscription.modify(
+            stripe_subscription_id,
+            cancel_at_period_end=True,
+        )
+    except stripe.error.StripeError as e:
+        raise ValidationError(f"Stripe error (cancel_subscription_at_period_end): {str(e)}") from e
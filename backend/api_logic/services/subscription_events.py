@@ -0,0 +1,73 @@
+from api_logic.services.entitlement_service import invalidate_entitlements
+from api_logic.services.history_service import record_subscription_history, record_subscription_history_bulk
+from api_logic.services.notification_service import notify_user
+from api_logic.services.outbox_service import (
+    record_subscription_event,
+    record_subscription_events,
+    SUBSCRIPTION_ACTIVATED,
+    SUBSCRIPTION_CANCELLED,
+    SUBSCRIPTION_EXTENDED
+)
+from api_logic.services import rollup_service
+
+
+def subscription_activated(user_subscription):
+    """
+    Records a newly activated subscription everywhere that tracks changes.
+
+    Call inside the transaction that created the row: outbox, history and
+    rollups are written atomically with it; cache invalidation and stream
+    notifications take effect on commit.
+    """
+    event = record_subscription_event(user_subscription, SUBSCRIPTION_ACTIVATED)
+    record_subscription_history(
+        user_subscription, SUBSCRIPTION_ACTIVATED, at=user_subscription.created_at)
+    rollup_service.record_activation(user_subscription)
+    invalidate_entitlements([user_subscription.user_id])
+    notify_user(user_subscription.user_id, SUBSCRIPTION_ACTIVATED, event.payload, event.id)
+
+
+def subscription_cancelled(user_subscription):
+    """Records a cancellation; same transactional contract as `subscription_activated`."""
+    event = record_subscription_event(user_subscription, SUBSCRIPTION_CANCELLED)
+    record_subscription_history(
+        user_subscription, SUBSCRIPTION_CANCELLED, at=user_subscription.cancelled_at)
+    rollup_service.record_cancellation(user_subscription)
+    invalidate_entitlements([user_subscription.user_id])
+    notify_user(user_subscription.user_id, SUBSCRIPTION_CANCELLED, event.payload, event.id)
+
+
+def _notify_all(events):
+    for event in events:
+        notify_user(event.user_id, event.event_type, event.payload, event.id)
+
+
+def subscriptions_cancelled(user_subscriptions):
+    """Bulk variant of `subscription_cancelled` for rows cancelled by one UPDATE."""
+    user_subscriptions = list(user_subscriptions)
+    if not user_subscriptions:
+        return
+    events = record_subscription_events(user_subscriptions, SUBSCRIPTION_CANCELLED)
+    record_subscription_history_bulk(
+        user_subscriptions, SUBSCRIPTION_CANCELLED, at=user_subscriptions[0].cancelled_at)
+    rollup_service.record_cancellations(user_subscriptions)
+    invalidate_entitlements({user_subscription.user_id for user_subscription in user_subscriptions})
+    _notify_all(events)
+
+
+def subscriptions_extended(user_subscriptions):
+    """
+    Records subscriptions whose `current_period_end` was moved by one UPDATE.
+
+    The counts and MRR are unchanged, so no rollup is touched; the outbox,
+    history, cached entitlements and open streams are updated as for a
+    cancellation.
+    """
+    user_subscriptions = list(user_subscriptions)
+    if not user_subscriptions:
+        return
+    events = record_subscription_events(user_subscriptions, SUBSCRIPTION_EXTENDED)
+    record_subscription_history_bulk(
+        user_subscriptions, SUBSCRIPTION_EXTENDED, at=user_subscriptions[0].updated_at)
+    invalidate_entitlements({user_subscription.user_id for user_subscription in user_subscriptions})
+    _notify_all(events)
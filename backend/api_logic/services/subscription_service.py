@@ -1,8 +1,15 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import User
 from rest_framework.exceptions import ValidationError
-from api_logic.models import Subscription, UserSubscription
-from api_logic.serializers import UserSubscriptionSerializer
+from api_logic.models import UserSubscription
+from .checkout_service import CheckoutInProgress, get_or_create_checkout
+from .outbox_service import subscription_payload
+from .plan_catalog import plan_catalog
+from .stripe_cancellation_service import enqueue_stripe_cancellation, enqueue_stripe_cancellations
+from .subscription_events import subscription_cancelled, subscriptions_cancelled, subscriptions_extended
 from .stripe_service import create_customer, create_product, create_price, create_subscription, create_checkout_session
 
 
@@ -11,49 +18,131 @@ def subscribe_user(user_id, subscription_id):
         user = User.objects.filter(pk=user_id).first()
         if not user:
             raise ValidationError("User not found.")
-        subscription_plan = Subscription.objects.filter(
-            pk=subscription_id).first()
+        subscription_plan = plan_catalog.get_by_id(subscription_id)
         if not subscription_plan:
             raise ValidationError("Subscription plan not found.")
-        if UserSubscription.objects.filter(user=user, subscription=subscription_plan, is_active=True).exists():
+        if UserSubscription.objects.filter(user=user, subscription_id=subscription_plan.id, is_active=True).exists():
             raise ValidationError("User is already subscribed to this plan.")
 
-        # Stripe setup
-        customer = create_customer(user)
-        product = create_product(subscription_plan.name)
-        price = create_price(subscription_plan.price, "usd",
-                             subscription_plan.interval, product.id)
-        
-        success_url = "https://yourfrontend.com/success?session_id={CHECKOUT_SESSION_ID}"
-        cancel_url = "https://yourfrontend.com/cancel"
-        session = create_checkout_session(
-            customer.id, price.id, success_url, cancel_url)
+        def create_session():
+            # Stripe setup
+            customer = create_customer(user)
+            product = create_product(subscription_plan.name)
+            price = create_price(subscription_plan.price, "usd",
+                                 subscription_plan.interval, product.id)
+
+            success_url = "https://yourfrontend.com/success?session_id={CHECKOUT_SESSION_ID}"
+            cancel_url = "https://yourfrontend.com/cancel"
+            return create_checkout_session(
+                customer.id, price.id, success_url, cancel_url)
+
+        # Repeated requests reuse the still-open session instead of creating a new one
+        checkout_url = get_or_create_checkout(user, subscription_plan, create_session)
 
         return {
-            "checkout_url": session.url
+            "checkout_url": checkout_url
         }
-    except ValidationError:
+    except (ValidationError, CheckoutInProgress):
         raise
     except Exception as e:
         raise ValidationError(f"Failed to subscribe user: {str(e)}")
 
 
+def _cancel_active_subscription(user_id, now):
+    """
+    Cancels one active subscription of the user with a single conditional
+    UPDATE ... RETURNING and returns the cancelled row, or None.
+
+    `is_active` is re-checked by the UPDATE itself, so when two requests race
+    only one of them gets a row back; the other sees nothing to cancel.
+    """
+    table = UserSubscription._meta.db_table
+    columns = ', '.join(field.column for field in UserSubscription._meta.concrete_fields)
+    rows = list(UserSubscription.objects.raw(
+        f"UPDATE {table} SET is_active = %s, cancelled_at = %s, updated_at = %s "
+        f"WHERE is_active = %s AND id = ("
+        f"SELECT id FROM {table} WHERE user_id = %s AND is_active = %s ORDER BY id LIMIT 1"
+        f") RETURNING {columns}",
+        [False, now, now, True, user_id, True],
+    ))
+    return rows[0] if rows else None
+
+
 def unsubscribe_user(user_id):
+    """
+    Cancels the user's active subscription.
+
+    The row update, change fan-out and the queued Stripe cancellation commit
+    together; Stripe itself is called later by the `process_stripe_cancellations`
+    worker, so this never waits on Stripe.
+
+    Returns:
+        bool: False if the user had no active subscription.
+    """
     try:
-        user_subscription = UserSubscription.objects.filter(
-            user_id=user_id, is_active=True).first()
-        if not user_subscription:
-            return False
-        user_subscription.is_active = False
-        user_subscription.cancelled_at = timezone.now()
-        user_subscription.save()
+        with transaction.atomic():
+            user_subscription = _cancel_active_subscription(user_id, timezone.now())
+            if user_subscription is None:
+                return False
+            subscription_cancelled(user_subscription)
+            enqueue_stripe_cancellation(user_subscription)
         return True
     except Exception as e:
         raise ValidationError(f"Failed to unsubscribe user: {str(e)}")
 
 
+def cancel_subscriptions(subscription_ids):
+    """
+    Cancels the given subscriptions with a single UPDATE, records the change
+    for every row that was still active and queues their Stripe
+    cancellations, all in one transaction.
+
+    Returns:
+        int: Number of subscriptions cancelled.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            UserSubscription.objects.select_for_update()
+            .filter(id__in=list(subscription_ids), is_active=True)
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        cancelled = UserSubscription.objects.filter(id__in=ids).update(
+            is_active=False, cancelled_at=now, updated_at=now)
+        cancelled_rows = list(UserSubscription.objects.filter(id__in=ids))
+        subscriptions_cancelled(cancelled_rows)
+        enqueue_stripe_cancellations(cancelled_rows)
+    return cancelled
+
+
+def extend_subscriptions(subscription_ids, days):
+    """
+    Moves `current_period_end` of the given subscriptions `days` days later
+    with a single UPDATE and records the change for every row.
+
+    Returns:
+        int: Number of subscriptions extended.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            UserSubscription.objects.select_for_update()
+            .filter(id__in=list(subscription_ids))
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        extended = UserSubscription.objects.filter(id__in=ids).update(
+            current_period_end=F('current_period_end') + timedelta(days=days), updated_at=now)
+        subscriptions_extended(UserSubscription.objects.filter(id__in=ids))
+    return extended
+
+
 def get_user_subscription(user_id):
     try:
+        from api_logic.serializers import UserSubscriptionSerializer
         user_subscription = UserSubscription.objects.filter(
             user_id=user_id, is_active=True).first()
         return UserSubscriptionSerializer(user_subscription).data if user_subscription else None
@@ -61,6 +150,19 @@ def get_user_subscription(user_id):
         raise ValidationError(f"Failed to get user subscription: {str(e)}")
 
 
+def get_subscription_state(user_id):
+    """
+    Returns the user's active subscription in the outbox payload shape, or
+    None. One query on the partial (user, current_period_end) index.
+    """
+    user_subscription = (
+        UserSubscription.objects.filter(user_id=user_id, is_active=True)
+        .order_by('-current_period_end')
+        .first()
+    )
+    return subscription_payload(user_subscription) if user_subscription else None
+
+
 def is_user_subscribed(user_id):
     try:
         return UserSubscription.objects.filter(user_id=user_id, is_active=True).exists()
@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from knox.models import AuthToken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def expired_tokens(now=None):
+    """
+    Returns a queryset with every knox token whose expiry is in the past.
+
+    Tokens created with `expiry=None` never expire and are not included.
+    """
+    return AuthToken.objects.filter(expiry__lt=now or timezone.now())
+
+
+def count_active_tokens(user, now=None):
+    """
+    Counts the tokens of a user that are still usable.
+
+    Expired rows stay in the table until the cleanup job removes them, so
+    they have to be excluded explicitly when enforcing the device limit.
+    """
+    now = now or timezone.now()
+    return AuthToken.objects.filter(user=user).exclude(expiry__lt=now).count()
+
+
+def purge_expired_tokens(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, pause=0.0, now=None):
+    """
+    Deletes expired knox tokens in bounded chunks.
+
+    Every chunk selects at most `batch_size` primary keys and deletes them in
+    its own short transaction, so locks are held briefly and only one chunk
+    of keys is kept in memory at a time.
+
+    Args:
+        batch_size (int): Maximum number of rows deleted per transaction.
+        max_batches (int | None): Stop after this many chunks (None = until done).
+        pause (float): Seconds to sleep between chunks to throttle the job.
+        now (datetime | None): Cut-off time, defaults to the current time.
+
+    Returns:
+        dict: `deleted`, `batches`, `elapsed` (seconds) and `rows_per_sec`.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
+
+    cutoff = now or timezone.now()
+    deleted = 0
+    batches = 0
+    started = time.perf_counter()
+
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            digests = list(
+                expired_tokens(cutoff)
+                .order_by()
+                .values_list('digest', flat=True)[:batch_size]
+            )
+            if not digests:
+                break
+            AuthToken.objects.filter(digest__in=digests).delete()
+
+        deleted += len(digests)
+        batches += 1
+        if len(digests) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'deleted': deleted,
+        'batches': batches,
+        'elapsed': elapsed,
+        'rows_per_sec': deleted / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+class TokenCleanupScheduler(object):
+    """Runs `purge_expired_tokens` periodically in a daemon thread.
+
+    Enabled by setting `TOKEN_CLEANUP_INTERVAL` (seconds) to a positive
+    value and started by the serving entry points (`nadneshtata.wsgi`/`asgi`),
+    so management commands never run it. A process that forks (e.g. a
+    gunicorn --preload master) stops its thread and each child starts its
+    own. Intended for single-process deployments; larger setups should run
+    the `purge_expired_tokens` management command from cron instead.
+    """
+
+    _lock = threading.Lock()
+    _instance = None
+    _fork_hooks_registered = False
+
+    def __init__(self, interval, batch_size=DEFAULT_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='token-cleanup', daemon=True)
+
+    @classmethod
+    def start_from_settings(cls):
+        interval = getattr(settings, 'TOKEN_CLEANUP_INTERVAL', 0)
+        if not interval or interval <= 0:
+            return None
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(
+                    interval,
+                    getattr(settings, 'TOKEN_CLEANUP_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+                )
+                cls._instance._thread.start()
+            if not cls._fork_hooks_registered and hasattr(os, 'register_at_fork'):
+                os.register_at_fork(before=cls._stop_before_fork, after_in_child=cls.start_from_settings)
+                cls._fork_hooks_registered = True
+        return cls._instance
+
+    @classmethod
+    def _stop_before_fork(cls):
+        # Threads do not survive a fork; the parent stops purging and every
+        # child starts its own scheduler instead.
+        if cls._instance is not None:
+            cls._instance.stop()
+            cls._instance = None
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                stats = purge_expired_tokens(batch_size=self.batch_size)
+                if stats['deleted']:
+                    logger.info(
+                        "Purged %d expired tokens in %.2fs (%.0f rows/sec)",
+                        stats['deleted'], stats['elapsed'], stats['rows_per_sec'])
+            except Exception:
+                logger.exception("Expired token cleanup failed")
@@ -1,13 +1,25 @@
+import json
 import os
-import stripe
+from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.timezone import make_aware
 from datetime import datetime
 from django.contrib.auth.models import User
-from api_logic.models import Subscription, UserSubscription
+from api_logic.models import UserSubscription
+from api_logic.services.checkout_service import clear_pending_checkout
+from api_logic.services.plan_catalog import plan_catalog
+from api_logic.services.stripe_client import get_stripe
+from api_logic.services.subscription_events import subscription_activated
+from api_logic.services.webhook_verification import (
+    WebhookVerificationError,
+    extract_event_id,
+    seen_events,
+    verify_signature,
+    DEFAULT_TOLERANCE
+)
 
-stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'test-key')
 endpoint_secret = os.getenv('STRIPE_WEBHOOK_SECRET', 'test-webhook-secret')
 
 
@@ -17,15 +29,26 @@ def stripe_webhook(request):
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
 
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, endpoint_secret
+        verify_signature(
+            payload, sig_header, endpoint_secret,
+            tolerance=getattr(settings, 'STRIPE_WEBHOOK_TOLERANCE', DEFAULT_TOLERANCE)
         )
-    except ValueError:
+    except WebhookVerificationError:
         return HttpResponse(status=400)
-    except stripe.error.SignatureVerificationError:
+
+    # Stripe retries deliveries; acknowledge events we already handled
+    # without parsing the body again.
+    event_id = extract_event_id(payload)
+    if event_id and seen_events.seen(event_id):
+        return HttpResponse(status=200)
+
+    try:
+        event = json.loads(payload)
+    except ValueError:
         return HttpResponse(status=400)
 
     if event['type'] == 'checkout.session.completed':
+        stripe = get_stripe()
         session = event['data']['object']
 
         customer_id = session.get('customer')
@@ -48,24 +71,27 @@ def stripe_webhook(request):
         product = stripe.Product.retrieve(product_id)
         subscription_name = product['name']
 
-        try:
-            subscription_plan = Subscription.objects.get(
-                name=subscription_name)
-        except Subscription.DoesNotExist:
+        subscription_plan = plan_catalog.get_by_name(subscription_name)
+        if not subscription_plan:
             return HttpResponse(status=400)
 
-        UserSubscription.objects.create(
-            user=user,
-            subscription=subscription_plan,
-            stripe_subscription_id=subscription_id,
-            is_active=True,
-            current_period_end=make_aware(
-                datetime.fromtimestamp(
-                    stripe_subscription["current_period_end"])
+        with transaction.atomic():
+            user_subscription = UserSubscription.objects.create(
+                user=user,
+                subscription_id=subscription_plan.id,
+                stripe_subscription_id=subscription_id,
+                is_active=True,
+                current_period_end=make_aware(
+                    datetime.fromtimestamp(
+                        stripe_subscription["current_period_end"])
+                )
             )
-        )
+            subscription_activated(user_subscription)
+        clear_pending_checkout(user, subscription_plan)
 
     elif event['type'] == 'invoice.payment_failed':
         pass
 
+    if event_id:
+        seen_events.mark(event_id, event['type'])
     return HttpResponse(status=200)
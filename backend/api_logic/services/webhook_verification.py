@@ -0,0 +1,169 @@
+import hashlib
+import hmac
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from api_logic.models import ProcessedWebhookEvent
+
+DEFAULT_TOLERANCE = 300
+DEFAULT_SEEN_CACHE_SIZE = 10000
+DEFAULT_RETENTION_DAYS = 30
+# Stripe retries a delivery for up to three days; ids must outlive that.
+MIN_RETENTION = timedelta(days=3)
+
+# Stripe serializes the event id as the first top-level key; nested objects
+# never carry the `evt_` prefix, so the first match is the event id.
+_EVENT_ID_RE = re.compile(rb'"id"\s*:\s*"(evt_[A-Za-z0-9_]+)"')
+
+
+class WebhookVerificationError(ValueError):
+    """Raised when a webhook signature header is missing, malformed, stale or wrong."""
+
+
+def verify_signature(payload, sig_header, secret, tolerance=DEFAULT_TOLERANCE, now=None):
+    """
+    Verifies a Stripe `Stripe-Signature` header against the raw request body.
+
+    The HMAC is computed over the raw bytes, without decoding or parsing the
+    payload, and the timestamp must lie within `tolerance` seconds of `now`.
+
+    Args:
+        payload (bytes): The raw request body.
+        sig_header (str): Value of the `Stripe-Signature` header.
+        secret (str): The endpoint signing secret.
+        tolerance (int): Allowed clock skew / replay window in seconds.
+        now (float | None): Current unix time, defaults to `time.time()`.
+
+    Returns:
+        int: The signed timestamp.
+
+    Raises:
+        WebhookVerificationError: If the header is invalid or does not match.
+    """
+    if not sig_header:
+        raise WebhookVerificationError("Missing signature header.")
+
+    timestamp = None
+    signatures = []
+    for item in sig_header.split(','):
+        key, _, value = item.strip().partition('=')
+        if key == 't':
+            try:
+                timestamp = int(value)
+            except ValueError:
+                raise WebhookVerificationError("Malformed signature timestamp.")
+        elif key == 'v1':
+            signatures.append(value.encode('ascii', 'ignore'))
+
+    if timestamp is None or not signatures:
+        raise WebhookVerificationError("Malformed signature header.")
+
+    now = time.time() if now is None else now
+    if tolerance and abs(now - timestamp) > tolerance:
+        raise WebhookVerificationError("Signature timestamp outside the tolerance window.")
+
+    mac = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+    mac.update(str(timestamp).encode('ascii'))
+    mac.update(b'.')
+    mac.update(payload)
+    expected = mac.hexdigest().encode('ascii')
+
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise WebhookVerificationError("Signature does not match the payload.")
+    return timestamp
+
+
+def extract_event_id(payload):
+    """Returns the Stripe event id from the raw body without parsing it, or None."""
+    match = _EVENT_ID_RE.search(payload)
+    return match.group(1).decode('ascii') if match else None
+
+
+class SeenEventCache(object):
+    """Bounded LRU of processed event ids, backed by ProcessedWebhookEvent.
+
+    Lookups hit the in-memory LRU first and fall back to the database, so a
+    replay is recognised even after a restart or on another worker.
+    """
+
+    def __init__(self, max_size=DEFAULT_SEEN_CACHE_SIZE, persist=True):
+        self.max_size = max_size
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._ids = OrderedDict()
+
+    def _remember(self, event_id):
+        with self._lock:
+            self._ids[event_id] = True
+            self._ids.move_to_end(event_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def seen(self, event_id):
+        with self._lock:
+            if event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                return True
+        if self.persist and ProcessedWebhookEvent.objects.filter(event_id=event_id).exists():
+            self._remember(event_id)
+            return True
+        return False
+
+    def mark(self, event_id, event_type=''):
+        if self.persist:
+            try:
+                ProcessedWebhookEvent.objects.get_or_create(
+                    event_id=event_id, defaults={'event_type': event_type})
+            except IntegrityError:
+                # Another worker recorded it concurrently.
+                pass
+        self._remember(event_id)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+def purge_processed_events(older_than, batch_size=1000):
+    """
+    Deletes ProcessedWebhookEvent rows recorded before `older_than`, one
+    short transaction per batch.
+
+    Args:
+        older_than (datetime): Cut-off; must be at least MIN_RETENTION ago,
+            so ids of events Stripe may still retry are kept.
+        batch_size (int): Rows deleted per transaction.
+
+    Returns:
+        int: Number of rows deleted.
+
+    Raises:
+        ValueError: If the cut-off is too recent or batch_size is not positive.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
+    if older_than > timezone.now() - MIN_RETENTION:
+        raise ValueError("Processed events must be kept for at least 3 days.")
+
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                ProcessedWebhookEvent.objects
+                .filter(created_at__lt=older_than)
+                .order_by()
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            ProcessedWebhookEvent.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+
+seen_events = SeenEventCache(
+    max_size=getattr(settings, 'STRIPE_WEBHOOK_SEEN_CACHE_SIZE', DEFAULT_SEEN_CACHE_SIZE))
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api_logic.models import Subscription
+from api_logic.services.plan_catalog import on_plan_changed
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_plan_changed(sender, instance, **kwargs):
+    on_plan_changed()
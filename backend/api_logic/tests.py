@@ -1,3 +1,692 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from knox.models import AuthToken
+from api_logic import hashers, renderers
+from api_logic.hashers import TunedScryptPasswordHasher
+from django.utils import timezone
+from api_logic.models import (
+    DailySubscriptionRollup,
+    OutboxEvent,
+    PendingCheckout,
+    PlanCatalogVersion,
+    ProcessedWebhookEvent,
+    StripeCancellation,
+    Subscription,
+    UserSubscription,
+    UserSubscriptionHistory,
+)
+from api_logic.services import (
+    batch_service,
+    checkout_service,
+    history_service,
+    outbox_service,
+    rollup_service,
+    stripe_cancellation_service,
+    token_service,
+    webhook,
+)
+from api_logic.services.subscription_service import cancel_subscriptions
+from api_logic.services.plan_catalog import current_version, plan_catalog
+from api_logic.services.stream_ticket_service import issue_ticket
+from api_logic.services.webhook_verification import (
+    WebhookVerificationError,
+    seen_events,
+    verify_signature,
+)
 
-# Create your tests here.
+SECRET = 'whsec_test'
+NOW = 1700000000
+
+
+def sign(payload, secret=SECRET, timestamp=NOW):
+    mac = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256)
+    return f"t={timestamp},v1={mac.hexdigest()}"
+
+
+class VerifySignatureTests(SimpleTestCase):
+    payload = b'{"id": "evt_123", "type": "checkout.session.completed"}'
+
+    def test_valid_signature(self):
+        self.assertEqual(verify_signature(self.payload, sign(self.payload), SECRET, now=NOW), NOW)
+
+    def test_any_matching_v1_is_accepted(self):
+        header = f"t={NOW},v1={'0' * 64},{sign(self.payload).split(',')[1]}"
+        self.assertEqual(verify_signature(self.payload, header, SECRET, now=NOW), NOW)
+
+    def test_wrong_signature(self):
+        with self.assertRaises(WebhookVerificationError):
+            verify_signature(self.payload, sign(self.payload, secret='whsec_other'), SECRET, now=NOW)
+
+    def test_tampered_payload(self):
+        with self.assertRaises(WebhookVerificationError):
+            verify_signature(self.payload + b' ', sign(self.payload), SECRET, now=NOW)
+
+    def test_stale_timestamp(self):
+        header = sign(self.payload, timestamp=NOW - 301)
+        with self.assertRaises(WebhookVerificationError):
+            verify_signature(self.payload, header, SECRET, tolerance=300, now=NOW)
+
+    def test_missing_v1(self):
+        with self.assertRaises(WebhookVerificationError):
+            verify_signature(self.payload, f"t={NOW},v0=abc", SECRET, now=NOW)
+
+    def test_missing_header(self):
+        with self.assertRaises(WebhookVerificationError):
+            verify_signature(self.payload, None, SECRET, now=NOW)
+
+
+class WebhookReplayTests(TestCase):
+    def setUp(self):
+        seen_events.clear()
+        self.addCleanup(seen_events.clear)
+
+    def post(self, payload):
+        request = RequestFactory().post(
+            '/api/webhook/stripe/', data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign(payload, secret=webhook.endpoint_secret, timestamp=NOW))
+        with mock.patch('api_logic.services.webhook_verification.time.time', return_value=NOW):
+            return webhook.stripe_webhook(request)
+
+    def test_replay_short_circuits(self):
+        payload = json.dumps({'id': 'evt_replayed', 'type': 'checkout.session.completed'}).encode()
+        ProcessedWebhookEvent.objects.create(event_id='evt_replayed', event_type='checkout.session.completed')
+
+        with mock.patch.object(webhook.json, 'loads') as loads:
+            response = self.post(payload)
+
+        self.assertEqual(response.status_code, 200)
+        loads.assert_not_called()
+
+    def test_unsigned_delivery_is_rejected(self):
+        payload = json.dumps({'id': 'evt_unsigned', 'type': 'invoice.payment_failed'}).encode()
+        request = RequestFactory().post(
+            '/api/webhook/stripe/', data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f"t={NOW},v1={'0' * 64}")
+        with mock.patch('api_logic.services.webhook_verification.time.time', return_value=NOW):
+            response = webhook.stripe_webhook(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProcessedWebhookEvent.objects.filter(event_id='evt_unsigned').exists())
+
+    def test_first_delivery_is_recorded(self):
+        payload = json.dumps({'id': 'evt_new', 'type': 'invoice.payment_failed'}).encode()
+        self.assertEqual(self.post(payload).status_code, 200)
+        self.assertTrue(ProcessedWebhookEvent.objects.filter(event_id='evt_new').exists())
+
+
+class JSONBackendTests(SimpleTestCase):
+    payload = {
+        'id': 7,
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'price': Decimal('20.50'),
+        'created_at': datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        'day': date(2026, 1, 2),
+        'at': time(3, 4, 5),
+        'grace': timedelta(seconds=5),
+        'nested': [{'ok': True, 'none': None}],
+        3: 'non-string key',
+    }
+
+    def backends(self):
+        names = [name for name, (available, _) in renderers._BACKENDS.items() if available()]
+        self.assertIn('stdlib', names)
+        return {name: renderers.get_json_backend(name)[1] for name in names}
+
+    def test_backends_produce_the_same_json(self):
+        outputs = {name: json.loads(dumps(self.payload)) for name, dumps in self.backends().items()}
+        for name, output in outputs.items():
+            self.assertEqual(output, outputs['stdlib'], name)
+        self.assertEqual(outputs['stdlib']['created_at'], '2026-01-02T03:04:05.678Z')
+        self.assertEqual(outputs['stdlib']['grace'], 'P0DT00H00M05S')
+
+    def test_backends_reject_sets(self):
+        for name, dumps in self.backends().items():
+            with self.assertRaises(TypeError, msg=name):
+                dumps({'ids': {1, 2}})
+
+    def test_auto_does_not_pick_msgspec(self):
+        self.assertIn(renderers.get_json_backend('auto')[0], ('orjson', 'stdlib'))
+
+    def test_renderer_falls_back_for_unsupported_types(self):
+        rendered = renderers.FastJSONRenderer().render({'ids': {1}})
+        self.assertEqual(json.loads(rendered), {'ids': [1]})
+
+
+class ListSink(object):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def publish(self, events):
+        if self.fail:
+            raise IOError("sink down")
+        self.batches.append([event['id'] for event in events])
+
+
+def outbox_event(user_id=1):
+    return OutboxEvent.objects.create(event_type='subscription.activated', user_id=user_id, payload={})
+
+
+class OutboxRelayTests(TestCase):
+    def test_relay_numbers_events_without_gaps(self):
+        events = [outbox_event() for _ in range(3)]
+        sink = ListSink()
+
+        self.assertEqual(outbox_service.relay_batch(sink, batch_size=2), 2)
+        self.assertEqual(outbox_service.relay_batch(sink, batch_size=2), 1)
+        self.assertEqual(outbox_service.relay_batch(sink, batch_size=2), 0)
+
+        self.assertEqual(sink.batches, [[events[0].id, events[1].id], [events[2].id]])
+        rows = OutboxEvent.objects.order_by('position')
+        self.assertEqual([row.position for row in rows], [1, 2, 3])
+        self.assertTrue(all(row.published_at for row in rows))
+
+    def test_feed_only_serves_numbered_events(self):
+        outbox_event()
+        outbox_service.relay_batch(ListSink())
+        first = outbox_service.get_changes(since=0)
+        self.assertEqual(first['next_cursor'], 1)
+
+        late = outbox_event()
+        self.assertEqual(outbox_service.get_changes(since=first['next_cursor'])['events'], [])
+
+        outbox_service.relay_batch(ListSink())
+        page = outbox_service.get_changes(since=first['next_cursor'])
+        self.assertEqual([event['id'] for event in page['events']], [late.id])
+        self.assertEqual(page['next_cursor'], 2)
+
+    def test_failed_sink_keeps_positions_and_retries(self):
+        event = outbox_event()
+        with self.assertRaises(IOError):
+            outbox_service.relay_batch(ListSink(fail=True))
+
+        event.refresh_from_db()
+        self.assertEqual(event.position, 1)
+        self.assertIsNone(event.published_at)
+
+        sink = ListSink()
+        self.assertEqual(outbox_service.relay_batch(sink), 1)
+        self.assertEqual(sink.batches, [[event.id]])
+        event.refresh_from_db()
+        self.assertEqual(event.position, 1)
+        self.assertIsNotNone(event.published_at)
+
+
+@override_settings(INTERNAL_SERVICE_KEYS={'billing': 'service-key'})
+class SubscriptionChangesViewTests(TestCase):
+    url = '/api/subscriptions/changes/'
+
+    def token(self, **fields):
+        user = User.objects.create_user(username=f"user{User.objects.count()}", **fields)
+        return AuthToken.objects.create(user)[1]
+
+    def test_internal_service_key(self):
+        response = self.client.get(self.url, HTTP_X_SERVICE_KEY='service-key')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'events': [], 'next_cursor': 0})
+
+    def test_staff_token(self):
+        token = self.token(is_staff=True)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION=f"Token {token}").status_code, 200)
+
+    def test_other_callers_are_refused(self):
+        token = self.token()
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION=f"Token {token}").status_code, 403)
+        self.assertEqual(self.client.get(self.url, HTTP_X_SERVICE_KEY='wrong').status_code, 401)
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+
+
+def live_subscription(username='subscriber', plan=None, **fields):
+    user = User.objects.get_or_create(username=username)[0]
+    plan = plan or Subscription.objects.get_or_create(name='Basic Plan')[0]
+    fields.setdefault('is_active', True)
+    fields.setdefault('current_period_end', timezone.now() + timedelta(days=30))
+    return UserSubscription.objects.create(
+        user=user, subscription=plan, stripe_subscription_id=f"sub_{username}", **fields)
+
+
+class SubscriptionHistoryTests(TestCase):
+    def setUp(self):
+        self.start = timezone.now() - timedelta(days=10)
+
+    def test_states_as_of_picks_the_latest_row_per_subscription(self):
+        first = live_subscription('first')
+        second = live_subscription('second')
+        history_service.record_subscription_history(first, 'subscription.activated', at=self.start)
+        history_service.record_subscription_history(second, 'subscription.activated', at=self.start)
+        first.is_active = False
+        first.cancelled_at = self.start + timedelta(days=5)
+        first.save()
+        history_service.record_subscription_history(first, 'subscription.cancelled', at=first.cancelled_at)
+
+        before = self.start + timedelta(days=1)
+        after = self.start + timedelta(days=6)
+        self.assertEqual(sorted(history_service.subscribers_as_of(before)), sorted([first.user_id, second.user_id]))
+        self.assertEqual(history_service.subscribers_as_of(after), [second.user_id])
+        self.assertEqual(history_service.subscribers_as_of(self.start - timedelta(days=1)), [])
+        self.assertEqual(history_service.user_subscription_as_of(first.user_id, before).change, 'subscription.activated')
+        self.assertIsNone(history_service.user_subscription_as_of(first.user_id, after))
+        self.assertEqual(history_service.states_as_of(after).count(), 2)
+
+    def test_archiving_keeps_as_of_answers(self):
+        cancelled_at = self.start + timedelta(days=2)
+        # Bulk-loaded row without any history of its own.
+        row = live_subscription(is_active=False, cancelled_at=cancelled_at)
+        UserSubscription.objects.filter(id=row.id).update(created_at=self.start)
+
+        self.assertEqual(history_service.archive_inactive_subscriptions(timezone.now()), 1)
+
+        self.assertFalse(UserSubscription.objects.filter(id=row.id).exists())
+        self.assertEqual(
+            list(UserSubscriptionHistory.objects.order_by('valid_from').values_list('change', 'is_active')),
+            [('subscription.activated', True), ('subscription.cancelled', False)])
+        self.assertEqual(history_service.subscribers_as_of(self.start + timedelta(days=1)), [row.user_id])
+        self.assertEqual(history_service.subscribers_as_of(cancelled_at), [])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.plan = Subscription.objects.create(name='Rollup Plan', price=Decimal('10.00'))
+        self.today = timezone.localdate()
+        plan_catalog.invalidate()
+        self.addCleanup(plan_catalog.invalidate)
+
+    def report(self):
+        return rollup_service.get_report(self.today, self.today)[0]
+
+    def cancel(self, *rows):
+        for row in rows:
+            row.is_active = False
+            row.cancelled_at = timezone.now()
+            row.save()
+
+    def test_cancellation_subtracts_the_price_added_on_activation(self):
+        row = live_subscription(plan=self.plan)
+        rollup_service.record_activation(row)
+        self.plan.price = Decimal('30.00')
+        self.plan.save()
+        plan_catalog.invalidate()
+        self.cancel(row)
+        rollup_service.record_cancellation(row)
+
+        report = self.report()
+        self.assertEqual(report['active_subscribers'], 0)
+        self.assertEqual(report['mrr'], Decimal('0.00'))
+        row.refresh_from_db()
+        self.assertEqual(row.monthly_price, Decimal('10.00'))
+
+    def test_backfill_matches_incremental_rollups(self):
+        rows = [live_subscription(f"rollup{i}", plan=self.plan) for i in range(3)]
+        for row in rows:
+            rollup_service.record_activation(row)
+        self.cancel(*rows[:2])
+        rollup_service.record_cancellations(rows[:2])
+        incremental = self.report()
+        self.assertEqual((incremental['new_subscribers'], incremental['churned_subscribers']), (3, 2))
+        self.assertEqual(incremental['mrr'], Decimal('10.00'))
+
+        self.assertEqual(rollup_service.backfill_rollups(), 1)
+        self.assertEqual(self.report(), incremental)
+
+    def test_swap_keeps_deltas_added_after_the_snapshot(self):
+        key = (self.today, self.plan.id)
+        seen = {key: [1, 0, Decimal('10.00'), Decimal(0)]}
+        rollup_service.apply_delta(*key, new=1, mrr_added=Decimal('10.00'))
+        # A second activation lands between the snapshot and the swap.
+        rollup_service.apply_delta(*key, new=1, mrr_added=Decimal('10.00'))
+
+        rollup_service._swap_day(self.today, {key: [1, 0, Decimal('10.00'), Decimal(0)]}, seen)
+        row = DailySubscriptionRollup.objects.get(day=self.today, subscription=self.plan)
+        self.assertEqual((row.new_subscribers, row.mrr_added), (2, Decimal('20.00')))
+
+
+@override_settings(INTERNAL_SERVICE_KEYS={'billing': 'service-key'})
+class BulkEntitlementViewTests(TestCase):
+    url = '/api/internal/entitlements/'
+
+    def post(self, body):
+        return self.client.post(self.url, data=json.dumps(body), content_type='application/json',
+                                HTTP_X_SERVICE_KEY='service-key')
+
+    def test_active_until_per_user(self):
+        row = live_subscription()
+        response = self.post({'user_ids': [row.user_id, 999999]})
+        self.assertEqual(response.status_code, 200)
+        active_until = response.json()['active_until']
+        self.assertIsNotNone(active_until[str(row.user_id)])
+        self.assertIsNone(active_until['999999'])
+
+    def test_non_object_body_is_rejected(self):
+        self.assertEqual(self.post([1, 2]).status_code, 400)
+
+    def test_invalid_user_ids_are_rejected(self):
+        self.assertEqual(self.post({'user_ids': []}).status_code, 400)
+        self.assertEqual(self.post({'user_ids': ['x']}).status_code, 400)
+
+    def test_requires_service_key(self):
+        self.assertEqual(self.client.post(self.url, data={'user_ids': [1]},
+                                          content_type='application/json').status_code, 401)
+
+
+class SubscriptionEventStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('streamer')
+        self.url = f"/api/users/{self.user.id}/subscription/events/"
+
+    def test_ticket_opens_one_stream(self):
+        _, token = AuthToken.objects.create(self.user)
+        response = self.client.post(self.url + 'ticket/', HTTP_AUTHORIZATION=f"Token {token}")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['expires_in'], 30)
+
+    def test_wsgi_requests_are_refused(self):
+        ticket, _ = issue_ticket(self.user)
+        self.assertEqual(self.client.get(self.url, {'ticket': ticket}).status_code, 501)
+
+    async def test_asgi_stream_starts_with_the_current_state(self):
+        ticket, _ = await sync_to_async(issue_ticket)(self.user)
+        response = await AsyncClient().get(self.url, {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = response.streaming_content
+        try:
+            self.assertEqual(await anext(frames), b'retry: 5000\n\n')
+            self.assertTrue((await anext(frames)).startswith(b'event: subscription.state\n'))
+        finally:
+            await frames.aclose()
+
+        # The ticket is single-use.
+        retry = await AsyncClient().get(self.url, {'ticket': ticket})
+        self.assertEqual(retry.status_code, 401)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_waiters_get_their_own_exception(self):
+        flight = checkout_service.SingleFlight()
+        original = RuntimeError('stripe down')
+        with self.assertRaises(RuntimeError) as leader:
+            flight.do('key', mock.Mock(side_effect=original))
+        self.assertIs(leader.exception, original)
+
+        # A waiter finds the leader's finished call.
+        call = checkout_service._Call()
+        call.error = original
+        call.event.set()
+        flight._calls['key'] = call
+        fn = mock.Mock()
+        with self.assertRaises(checkout_service.SharedCallError) as waiter:
+            flight.do('key', fn)
+        self.assertIs(waiter.exception.__cause__, original)
+        fn.assert_not_called()
+
+
+def checkout_session(session_id='cs_1'):
+    return mock.Mock(id=session_id, url=f"https://checkout.test/{session_id}",
+                     expires_at=int((timezone.now() + timedelta(hours=1)).timestamp()))
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer')
+        self.plan = Subscription.objects.get_or_create(name='Basic Plan')[0]
+        self.addCleanup(plan_catalog.invalidate)
+
+    def test_open_session_is_reused(self):
+        create_session = mock.Mock(return_value=checkout_session())
+        first = checkout_service.get_or_create_checkout(self.user, self.plan, create_session)
+        second = checkout_service.get_or_create_checkout(self.user, self.plan, create_session)
+        self.assertEqual(first, second)
+        self.assertEqual(create_session.call_count, 1)
+        self.assertIsNone(PendingCheckout.objects.get(user=self.user).claimed_until)
+
+    def test_failed_session_releases_the_claim(self):
+        create_session = mock.Mock(side_effect=RuntimeError('stripe down'))
+        with self.assertRaises(RuntimeError):
+            checkout_service.get_or_create_checkout(self.user, self.plan, create_session)
+        self.assertIsNone(PendingCheckout.objects.get(user=self.user).claimed_until)
+
+    @mock.patch.object(checkout_service, 'CLAIM_WAIT', timedelta(0))
+    def test_wait_for_another_claim_is_bounded(self):
+        PendingCheckout.objects.create(
+            user=self.user, subscription=self.plan, claimed_until=timezone.now() + timedelta(minutes=1))
+        create_session = mock.Mock()
+        with self.assertRaises(checkout_service.CheckoutInProgress):
+            checkout_service.get_or_create_checkout(self.user, self.plan, create_session)
+        create_session.assert_not_called()
+
+        _, token = AuthToken.objects.create(self.user)
+        response = self.client.post(f"/api/users/{self.user.id}/subscription/", {'plan_id': self.plan.id},
+                                    HTTP_AUTHORIZATION=f"Token {token}")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class StripeCancellationTests(TestCase):
+    def setUp(self):
+        self.row = live_subscription('leaving')
+        cancel_subscriptions([self.row.id])
+        self.job = StripeCancellation.objects.get(user_subscription_id=self.row.id)
+
+    def process(self, **modify):
+        stripe = stripe_cancellation_service.get_stripe()
+        with mock.patch.object(stripe.Subscription, 'modify', **modify) as modify_call:
+            result = stripe_cancellation_service.process_batch()
+        self.job.refresh_from_db()
+        return result, modify_call
+
+    def test_admin_cancellation_is_queued_and_sent(self):
+        self.assertFalse(UserSubscription.objects.get(id=self.row.id).is_active)
+        (completed, failed), modify_call = self.process()
+        self.assertEqual((completed, failed), (1, 0))
+        modify_call.assert_called_once_with('sub_leaving', cancel_at_period_end=True)
+        self.assertIsNotNone(self.job.completed_at)
+        # Completed jobs are not sent again.
+        self.assertEqual(self.process()[0], (0, 0))
+
+    def test_transient_error_is_retried_with_backoff(self):
+        stripe = stripe_cancellation_service.get_stripe()
+        (_, failed), _ = self.process(side_effect=stripe.error.APIConnectionError('timed out'))
+        self.assertEqual(failed, 1)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertGreater(self.job.next_attempt_at, timezone.now())
+        self.assertEqual(self.job.last_error, 'Stripe error (cancel_subscription_at_period_end): timed out')
+
+    def test_invalid_request_fails_at_once(self):
+        stripe = stripe_cancellation_service.get_stripe()
+        error = stripe.error.InvalidRequestError('No such subscription', 'id', code='resource_missing')
+        with self.assertLogs(stripe_cancellation_service.logger, 'ERROR'):
+            (_, failed), _ = self.process(side_effect=error)
+        self.assertEqual(failed, 1)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertIsNone(self.job.next_attempt_at)
+        self.assertIsNone(self.job.completed_at)
+        self.assertIn('No such subscription', self.job.last_error)
+
+
+SCRYPT = 'api_logic.hashers.TunedScryptPasswordHasher'
+
+
+class TunedScryptHasherTests(TestCase):
+    @override_settings(PASSWORD_HASHERS=[SCRYPT],
+                       PASSWORD_HASHER_PARAMS={'scrypt': {'work_factor': 2 ** 12, 'block_size': 8, 'parallelism': 1}})
+    def test_login_rehashes_a_hash_above_the_configured_cost(self):
+        # 2**15 needs more than OpenSSL's default 32 MiB scrypt limit.
+        old = TunedScryptPasswordHasher(work_factor=2 ** 15, block_size=8, parallelism=1)
+        user = User.objects.create(username='hashed', password=old.encode('secret-pass', old.salt()))
+
+        response = self.client.post('/api/users/login/', {'username': 'hashed', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$4096$'))
+        self.assertTrue(user.check_password('secret-pass'))
+
+
+class BatchViewTests(TestCase):
+    url = '/api/batch/'
+
+    def setUp(self):
+        self.user = User.objects.create_user('batcher')
+        _, self.token = AuthToken.objects.create(self.user)
+        self.addCleanup(plan_catalog.invalidate)
+
+    def post(self, body):
+        return self.client.post(self.url, data=json.dumps(body), content_type='application/json',
+                                HTTP_AUTHORIZATION=f"Token {self.token}")
+
+    def paths(self, *paths):
+        return self.post({'requests': [{'path': path} for path in paths]})
+
+    def test_entries_answer_in_order(self):
+        response = self.paths(f"/api/users/{self.user.id}/", '/api/plans/')
+        self.assertEqual(response.status_code, 200)
+        entries = response.json()['responses']
+        self.assertEqual([entry['status'] for entry in entries], [200, 200])
+        self.assertEqual(entries[0]['path'], f"/api/users/{self.user.id}/")
+
+    def test_failing_entry_does_not_fail_the_batch(self):
+        with mock.patch('api_logic.views.get_user_subscription', side_effect=RuntimeError('boom')), \
+                self.assertLogs(batch_service.logger, 'ERROR'):
+            response = self.paths(f"/api/users/{self.user.id}/subscription/", f"/api/users/{self.user.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['status'] for entry in response.json()['responses']], [500, 200])
+
+    def test_invalid_batches_are_rejected(self):
+        self.assertEqual(self.post([{'path': '/api/plans/'}]).status_code, 400)
+        self.assertEqual(self.post({'requests': []}).status_code, 400)
+        self.assertEqual(self.paths('/api/batch/').status_code, 400)
+        self.assertEqual(self.post({'requests': [{'path': '/api/plans/', 'method': 'POST'}]}).status_code, 400)
+
+    def test_catalog_version_is_read_only(self):
+        self.assertEqual(current_version(), 0)
+        self.assertFalse(PlanCatalogVersion.objects.exists())
+
+
+class TokenPurgeTests(TestCase):
+    def test_expired_tokens_are_purged_in_batches(self):
+        user = User.objects.create_user('devices')
+        tokens = [AuthToken.objects.create(user)[0] for _ in range(3)]
+        AuthToken.objects.filter(digest__in=[token.digest for token in tokens[:2]]).update(
+            expiry=timezone.now() - timedelta(hours=1))
+        self.assertEqual(token_service.count_active_tokens(user), 1)
+
+        result = token_service.purge_expired_tokens(batch_size=1)
+        self.assertEqual((result['deleted'], result['batches']), (2, 2))
+        self.assertEqual(list(AuthToken.objects.values_list('digest', flat=True)), [tokens[2].digest])
+
+
+class TokenOnlyLoginTests(TestCase):
+    def test_login_issues_a_token_without_a_session(self):
+        User.objects.create_user('tokenonly', password='secret-pass')
+        response = self.client.post('/api/users/login/', {'username': 'tokenonly', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['token'])
+        self.assertFalse(Session.objects.exists())
+        self.assertIsNotNone(User.objects.get(username='tokenonly').last_login)
+
+
+class PlanCatalogViewTests(TestCase):
+    url = '/api/plans/'
+
+    def setUp(self):
+        plan_catalog.invalidate()
+        self.addCleanup(plan_catalog.invalidate)
+
+    def test_etag_changes_with_the_catalog(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(name='Catalog Plan', price=Decimal('15.00'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(b'Catalog Plan', response.content)
+
+
+@mock.patch('api_logic.services.subscription_service.create_price')
+@mock.patch('api_logic.services.subscription_service.create_product')
+@mock.patch('api_logic.services.subscription_service.create_customer')
+class SubscribeCheckoutReuseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('subscriber')
+        _, self.token = AuthToken.objects.create(self.user)
+        self.plan = Subscription.objects.get_or_create(name='Basic Plan')[0]
+        plan_catalog.invalidate()
+        self.addCleanup(plan_catalog.invalidate)
+
+    def subscribe(self):
+        return self.client.post(f"/api/users/{self.user.id}/subscription/", {'plan_id': self.plan.id},
+                                HTTP_AUTHORIZATION=f"Token {self.token}")
+
+    def test_repeated_subscribe_reuses_the_session(self, *stripe_calls):
+        with mock.patch('api_logic.services.subscription_service.create_checkout_session',
+                        return_value=checkout_session()) as create_checkout:
+            first = self.subscribe()
+            second = self.subscribe()
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(first.json()['checkout_url'], second.json()['checkout_url'])
+        self.assertEqual(create_checkout.call_count, 1)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0, PROFILING_DUMP_DIR=None)
+class RequestProfilingTests(TestCase):
+    url = '/api/plans/'
+
+    def profile(self, user, flag='inline'):
+        _, token = AuthToken.objects.create(user)
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f"Token {token}", HTTP_X_PROFILE=flag)
+
+    def test_staff_gets_an_inline_report(self):
+        response = self.profile(User.objects.create_user('admin', is_staff=True))
+        self.assertIn('X-Profile-Id', response)
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertEqual(response.json()['id'], response['X-Profile-Id'])
+
+    def test_other_users_are_not_profiled(self):
+        response = self.profile(User.objects.create_user('member'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+
+class UserSubscriptionAdminTests(TestCase):
+    url = '/admin/api_logic/usersubscription/'
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pass'))
+        self.row = live_subscription('admin-target')
+
+    def test_changelist_and_exact_search(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.get(self.url, {'q': 'sub_admin-target'})
+        self.assertContains(response, 'admin-target')
+
+    def test_actions_update_in_bulk(self):
+        period_end = self.row.current_period_end
+        self.client.post(self.url, {'action': 'extend_subscriptions', '_selected_action': [self.row.id]})
+        self.row.refresh_from_db()
+        self.assertEqual(self.row.current_period_end, period_end + timedelta(days=30))
+
+        self.client.post(self.url, {'action': 'deactivate_subscriptions', '_selected_action': [self.row.id]})
+        self.row.refresh_from_db()
+        self.assertFalse(self.row.is_active)
+        self.assertTrue(StripeCancellation.objects.filter(user_subscription_id=self.row.id).exists())
+
+
+class HasherBenchmarkTests(SimpleTestCase):
+    def test_sweep_stops_at_the_first_cost_over_target(self):
+        # 10ms at 2**12, doubling with every step.
+        timings = lambda hasher, rounds: 10.0 * hasher.work_factor / 2 ** 12  # noqa: E731
+        with mock.patch.object(hashers, 'time_hasher', side_effect=timings):
+            results, best = hashers.benchmark('scrypt', target_ms=30)
+        self.assertEqual(best, {'work_factor': 2 ** 13})
+        self.assertEqual([params['work_factor'] for params, _ in results], [2 ** 12, 2 ** 13, 2 ** 14])
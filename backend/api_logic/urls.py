@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import RegisterUserView, GetUserView, UserSubscriptionView, LoginUserView
-from api_logic.services import webhook
+from .views import (RegisterUserView, GetUserView, UserSubscriptionView, LoginUserView, PlanCatalogView,
+                    SubscriptionChangesView, BulkEntitlementView,
+                    SubscriptionReportView, BatchView, SubscriptionStreamTicketView,
+                    stripe_webhook, subscription_event_stream)
 
 urlpatterns = [
     path('users/', RegisterUserView.as_view(), name="register_user"),
@@ -8,5 +10,17 @@ urlpatterns = [
     path('users/<int:user_id>/', GetUserView.as_view(), name="get_user"),
     path('users/<int:user_id>/subscription/',
          UserSubscriptionView.as_view(), name="user_subscription"),
-    path('webhook/stripe/', webhook.stripe_webhook, name='stripe-webhook'),
+    path('users/<int:user_id>/subscription/events/',
+         subscription_event_stream, name="user_subscription_events"),
+    path('users/<int:user_id>/subscription/events/ticket/',
+         SubscriptionStreamTicketView.as_view(), name="user_subscription_events_ticket"),
+    path('subscriptions/changes/', SubscriptionChangesView.as_view(),
+         name="subscription_changes"),
+    path('internal/entitlements/', BulkEntitlementView.as_view(),
+         name="bulk_entitlements"),
+    path('reports/subscriptions/', SubscriptionReportView.as_view(),
+         name="subscription_report"),
+    path('batch/', BatchView.as_view(), name="batch"),
+    path('plans/', PlanCatalogView.as_view(), name="plan_catalog"),
+    path('webhook/stripe/', stripe_webhook, name='stripe-webhook'),
 ]
@@ -3,6 +3,7 @@ from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode
 from django.contrib.sites.shortcuts import get_current_site
 from .tokens import account_activation_token
+from .renderers import FastJsonResponse
 from django.utils.encoding import force_bytes
 from django.core.mail import EmailMessage
 from django.contrib.auth.models import User
@@ -16,20 +17,20 @@ class HandleResponseUtils(object):
     1. The methods here are related to response handling
     """
     @staticmethod
-    def handle_response(status_code, message) -> JsonResponse:
+    def handle_response(status_code, message) -> FastJsonResponse:
         """
         Returns proper response data
         :param status_code: http status code
         :type status_code: http status code
         :param message: function that contains response
-        :rType: JsonResponse
-        :returns: JsonResponse
+        :rType: FastJsonResponse
+        :returns: FastJsonResponse encoded with the backend from JSON_RENDERER_BACKEND
         """
         # If the obj is type set return list(obj)
         if isinstance(message, set):
-            return JsonResponse(data=list(message), status=status_code, safe=False)
+            return FastJsonResponse(data=list(message), status=status_code)
         else:
-            return JsonResponse(data=message, status=status_code, safe=False)
+            return FastJsonResponse(data=message, status=status_code)
 
     @staticmethod
     def handle_response_data(status_code, message):
@@ -1,14 +1,40 @@
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.exceptions import ValidationError, AuthenticationFailed
+from .services.batch_service import execute_batch
+from .services.checkout_service import CheckoutInProgress
 from .services.auth_service import register_user, get_user_data, login_user
 from .services.subscription_service import (
+    get_subscription_state,
     get_user_subscription,
     subscribe_user,
     unsubscribe_user
 )
+from .services.entitlement_service import (
+    get_active_until,
+    to_binary,
+    to_ndjson,
+    DEFAULT_BATCH_LIMIT
+)
+from .services.outbox_service import get_changes, user_events_after, DEFAULT_FEED_LIMIT
+from .services.notification_service import broker, get_backend
+from .services.stream_ticket_service import issue_ticket, redeem_ticket
+from .services.plan_catalog import plan_catalog
+from .services.rollup_service import get_report
 from .utils import HandleResponseUtils
+import asyncio
+import json
+from datetime import date, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
 from knox.auth import TokenAuthentication
+from .authentication import ServiceKeyAuthentication, IsInternalService
 
 class RegisterUserView(APIView):
     permission_classes = [AllowAny]
@@ -89,6 +115,10 @@ class UserSubscriptionView(APIView):
             return HandleResponseUtils.handle_response(201, subscription)
         except KeyError:
             return HandleResponseUtils.handle_response(400, {"detail": "Missing field: plan_id"})
+        except CheckoutInProgress as e:
+            response = HandleResponseUtils.handle_response(409, {"detail": str(e)})
+            response["Retry-After"] = "1"
+            return response
         except ValidationError as e:
             return HandleResponseUtils.handle_response(400, {"detail": str(e)})
 
@@ -100,3 +130,205 @@ class UserSubscriptionView(APIView):
             return HandleResponseUtils.handle_response(404, {"detail": "User has no active subscription."})
         except ValidationError as e:
             return HandleResponseUtils.handle_response(400, {"detail": str(e)})
+
+
+class PlanCatalogView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        snapshot = plan_catalog.snapshot()
+        if request.headers.get("If-None-Match") == snapshot.etag:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(snapshot.body, content_type="application/json")
+        response["ETag"] = snapshot.etag
+        patch_cache_control(
+            response, public=True, max_age=getattr(settings, "PLAN_CATALOG_MAX_AGE", 300))
+        return response
+
+
+class SubscriptionChangesView(APIView):
+    """Change feed for internal services (X-Service-Key) and staff users."""
+    permission_classes = [IsInternalService | (IsAuthenticated & IsAdminUser)]
+    authentication_classes = [ServiceKeyAuthentication, TokenAuthentication]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since", 0))
+            limit = int(request.query_params.get("limit", DEFAULT_FEED_LIMIT))
+        except ValueError:
+            return HandleResponseUtils.handle_response(400, {"detail": "since and limit must be integers."})
+        return HandleResponseUtils.handle_response(200, get_changes(since=since, limit=limit))
+
+
+class BulkEntitlementView(APIView):
+    permission_classes = [IsInternalService]
+    authentication_classes = [ServiceKeyAuthentication]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return HandleResponseUtils.handle_response(400, {"detail": "Expected a JSON object."})
+        user_ids = request.data.get("user_ids")
+        limit = getattr(settings, "ENTITLEMENT_BATCH_LIMIT", DEFAULT_BATCH_LIMIT)
+        if not isinstance(user_ids, list) or not user_ids:
+            return HandleResponseUtils.handle_response(400, {"detail": "user_ids must be a non-empty list."})
+        if len(user_ids) > limit:
+            return HandleResponseUtils.handle_response(400, {"detail": f"At most {limit} user_ids per request."})
+        try:
+            active_until = get_active_until(user_ids)
+        except (TypeError, ValueError):
+            return HandleResponseUtils.handle_response(400, {"detail": "user_ids must be integers."})
+
+        output = request.query_params.get("output") or request.headers.get("Accept", "")
+        if "ndjson" in output:
+            return HttpResponse(to_ndjson(active_until), content_type="application/x-ndjson")
+        if "binary" in output or "octet-stream" in output:
+            return HttpResponse(to_binary(active_until), content_type="application/octet-stream")
+        return HandleResponseUtils.handle_response(
+            200, {"active_until": {str(user_id): end for user_id, end in active_until.items()}})
+
+
+class SubscriptionReportView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request):
+        try:
+            end = date.fromisoformat(request.query_params.get("to") or timezone.localdate().isoformat())
+            start = date.fromisoformat(request.query_params.get("from") or (end - timedelta(days=29)).isoformat())
+            plan_id = request.query_params.get("plan_id")
+            plan_id = int(plan_id) if plan_id else None
+        except ValueError:
+            return HandleResponseUtils.handle_response(400, {"detail": "Invalid from, to or plan_id."})
+        if start > end or (end - start).days > 3660:
+            return HandleResponseUtils.handle_response(400, {"detail": "Invalid date range."})
+        return HandleResponseUtils.handle_response(200, get_report(start, end, subscription_id=plan_id))
+
+
+class BatchView(APIView):
+    """Runs several GET requests to this API in one round trip, authenticated once."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    batchable = False
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return HandleResponseUtils.handle_response(400, {"detail": "Expected a JSON object."})
+        try:
+            body = execute_batch(request, request.data.get("requests"))
+        except ValidationError as e:
+            detail = e.detail[0] if isinstance(e.detail, list) else e.detail
+            return HandleResponseUtils.handle_response(400, {"detail": str(detail)})
+        return HttpResponse(body, content_type="application/json")
+
+
+@csrf_exempt
+def stripe_webhook(request):
+    # Imported on first delivery so the URLconf does not load the webhook
+    # handler (and the Stripe SDK) at start-up.
+    from .services.webhook import stripe_webhook as handle_stripe_webhook
+    return handle_stripe_webhook(request)
+
+
+class SubscriptionStreamTicketView(APIView):
+    """Exchanges the caller's token for a single-use ticket that opens one event stream."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    batchable = False
+
+    def post(self, request, user_id):
+        if request.user.id != user_id and not request.user.is_staff:
+            return HandleResponseUtils.handle_response(403, {"detail": "You do not have permission to perform this action."})
+        ticket, ttl = issue_ticket(request.user)
+        return HandleResponseUtils.handle_response(201, {"ticket": ticket, "expires_in": ttl})
+
+
+def _authenticate_stream(request):
+    # EventSource cannot send headers: browsers pass a single-use ticket as
+    # ?ticket=, other clients may still send their token in the header.
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Token "):
+        return redeem_ticket(request.GET.get("ticket"))
+    try:
+        user, _ = TokenAuthentication().authenticate_credentials(header[len("Token "):].encode())
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+def _stream_backlog(user_id, last_event_id):
+    """Outbox events after Last-Event-ID (if any) and the current state, as SSE frames."""
+    frames = []
+    if last_event_id is not None:
+        limit = getattr(settings, "SSE_REPLAY_LIMIT", DEFAULT_FEED_LIMIT)
+        for event in user_events_after(user_id, last_event_id, limit):
+            frames.append(_sse_frame(event.event_type, event.payload, event.id))
+    frames.append(_sse_frame("subscription.state", get_subscription_state(user_id)))
+    return frames
+
+
+def _sse_frame(event_type, data, event_id=None):
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    return frame + f"event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def subscription_event_stream(request, user_id):
+    """
+    Server-sent events stream that pushes the user's subscription changes
+    (e.g. checkout completed) as they happen, replacing client polling.
+
+    Browsers authenticate with `?ticket=` from SubscriptionStreamTicketView.
+    Each connection starts with the current state (`subscription.state`);
+    a client reconnecting with Last-Event-ID first gets the outbox events it
+    missed. Live events carry their outbox id as the SSE `id:`.
+
+    Runs as an async view: under ASGI an idle stream holds one small queue
+    on the event loop and no worker thread. Under WSGI the stream would pin
+    a worker for as long as the client stays connected, so the view answers
+    501 there instead of streaming.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HandleResponseUtils.handle_response(
+            501, {"detail": "Event streams require the ASGI server (nadneshtata.asgi)."})
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return HandleResponseUtils.handle_response(401, {"detail": "Authentication credentials were not provided."})
+    if user.id != user_id and not user.is_staff:
+        return HandleResponseUtils.handle_response(403, {"detail": "You do not have permission to perform this action."})
+    try:
+        last_event_id = int(request.headers["Last-Event-ID"]) if "Last-Event-ID" in request.headers else None
+    except ValueError:
+        last_event_id = None
+
+    get_backend().start()
+    keepalive = getattr(settings, "SSE_KEEPALIVE_SECONDS", 15)
+    # Subscribe before reading the backlog, so a change committed in between
+    # is queued rather than lost (at worst it is sent twice).
+    entry = broker.subscribe(user_id)
+    queue = entry[1]
+    try:
+        backlog = await sync_to_async(_stream_backlog)(user_id, last_event_id)
+    except BaseException:
+        broker.unsubscribe(user_id, entry)
+        raise
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            for frame in backlog:
+                yield frame
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse_frame(message["type"], message["data"], message.get("id"))
+        finally:
+            broker.unsubscribe(user_id, entry)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
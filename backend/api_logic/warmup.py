@@ -0,0 +1,101 @@
+import logging
+import os
+import time
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_database():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def warm_url_resolver():
+    resolver = get_resolver()
+    # Touching reverse_dict populates the resolver and imports every view module.
+    resolver.reverse_dict
+
+
+def warm_lazy_modules():
+    import api_logic.serializers  # noqa: F401
+    import api_logic.services.webhook  # noqa: F401
+
+
+def warm_stripe():
+    from api_logic.services.stripe_client import get_stripe
+    # Any authenticated call opens the HTTPS connection the SDK keeps alive.
+    get_stripe().Balance.retrieve()
+
+
+WARMUP_STEPS = (
+    ('database', warm_database),
+    ('url_resolver', warm_url_resolver),
+    ('lazy_modules', warm_lazy_modules),
+    ('stripe', warm_stripe),
+)
+
+# Steps that open sockets; they must not be inherited across a fork.
+CONNECTION_STEPS = ('database', 'stripe')
+
+
+def warm_up(steps=None):
+    """
+    Runs the warm-up steps named in `steps` (all by default) and returns the
+    time each one took in seconds. A failing step is logged and skipped so a
+    cold dependency never prevents the worker from starting.
+    """
+    steps = steps or _configured_steps()
+    timings = {}
+    for name, step in WARMUP_STEPS:
+        if name not in steps:
+            continue
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning("Warm-up step '%s' failed", name, exc_info=True)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def _configured_steps():
+    return getattr(settings, 'WARMUP_STEPS', None) or [name for name, _ in WARMUP_STEPS]
+
+
+def _release_connections():
+    # Runs in the parent right before a fork (e.g. gunicorn --preload), so
+    # children never share the parent's DB or Stripe sockets.
+    if any(connection.in_atomic_block for connection in connections.all()):
+        return
+    connections.close_all()
+    from api_logic.services.stripe_client import reset_http_client
+    reset_http_client()
+
+
+def _warm_connections():
+    steps = [name for name in _configured_steps() if name in CONNECTION_STEPS]
+    if steps:
+        warm_up(steps)
+
+
+def warm_up_on_start():
+    """
+    Warm-up hook for the serving entry points (`nadneshtata.wsgi`/`asgi`).
+
+    Does nothing unless `WARMUP_ON_START` is set, so management commands and
+    workers that only load the app registry are never affected. When the
+    process later forks, connections are closed before the fork and each
+    child opens its own; imports and the URL resolver stay shared.
+
+    Returns:
+        dict | None: Step timings, or None when disabled.
+    """
+    if not getattr(settings, 'WARMUP_ON_START', False):
+        return None
+    timings = warm_up()
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(before=_release_connections, after_in_child=_warm_connections)
+    return timings
@@ -0,0 +1,16 @@
+"""Shared bootstrap for the standalone benchmark scripts in this directory.
+
+Run scripts from the backend directory, e.g. `python benchmarks/json_response.py`.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nadneshtata.settings')
+    import django
+    django.setup()
@@ -0,0 +1,58 @@
+"""Micro-benchmark: microseconds per `handle_response` call for each JSON backend.
+
+    python benchmarks/json_response.py [--rows 500] [--repeat 200]
+"""
+import argparse
+import timeit
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from _setup import setup_django
+
+
+def build_payload(rows):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': i,
+            'uuid': uuid.uuid4(),
+            'username': f'user{i}',
+            'email': f'user{i}@example.com',
+            'is_active': i % 3 != 0,
+            'date_joined': now,
+            'subscription': {
+                'name': 'Basic Plan',
+                'price': Decimal('20.00'),
+                'interval': 'month',
+                'current_period_end': now,
+            },
+        }
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from api_logic.renderers import FastJsonResponse, get_json_backend
+
+    payload = build_payload(args.rows)
+    print(f"payload: {args.rows} rows, {args.repeat} responses per backend")
+    for requested in ('stdlib', 'orjson', 'msgspec'):
+        name, dumps = get_json_backend(requested)
+        if name != requested:
+            print(f"{requested:>8}: not installed")
+            continue
+        seconds = timeit.timeit(
+            lambda: FastJsonResponse(payload, dumps=dumps, status=200),
+            number=args.repeat)
+        print(f"{requested:>8}: {seconds / args.repeat * 1e6:10.1f} us/response")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: worker start-up cost and first-request latency, cold vs pre-warmed.
+
+Each scenario runs in a fresh interpreter, the way an autoscaled pod starts.
+
+    python benchmarks/startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from _setup import BACKEND_DIR
+
+CHILD = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nadneshtata.settings')
+from nadneshtata.wsgi import application
+t1 = time.perf_counter()
+import nadneshtata.urls
+t2 = time.perf_counter()
+stripe_loaded = 'stripe' in sys.modules
+from django.test import Client
+client = Client(HTTP_HOST='localhost')
+t3 = time.perf_counter()
+client.post('/api/webhook/stripe/', data=b'{}', content_type='application/json')
+t4 = time.perf_counter()
+print(json.dumps({'setup': t1 - t0, 'urlconf': t2 - t1, 'first_request': t4 - t3,
+                  'stripe_at_startup': stripe_loaded}))
+"""
+
+
+def run(env_overrides, runs):
+    env = dict(os.environ, **env_overrides)
+    env.pop('DJANGO_SETTINGS_MODULE', None)
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    scenarios = (
+        ('cold', {'WARMUP_ON_START': 'false'}),
+        ('warmed', {'WARMUP_ON_START': 'true'}),
+    )
+    for label, env in scenarios:
+        results = run(env, args.runs)
+        summary = {key: statistics.median(r[key] for r in results) * 1000
+                   for key in ('setup', 'urlconf', 'first_request')}
+        print(f"{label:>7}: setup {summary['setup']:7.1f} ms | "
+              f"urlconf {summary['urlconf']:6.1f} ms | "
+              f"first request {summary['first_request']:7.1f} ms | "
+              f"stripe imported at start-up: {results[0]['stripe_at_startup']}")
+
+
+if __name__ == '__main__':
+    main()
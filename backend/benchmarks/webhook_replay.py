@@ -0,0 +1,89 @@
+"""Benchmark: Stripe webhook verification under replay-heavy traffic.
+
+Compares `stripe.Webhook.construct_event` (HMAC + full JSON parse on every
+delivery) with the raw-bytes verifier plus the in-memory seen-event cache.
+
+    python benchmarks/webhook_replay.py [--events 2000] [--replay-ratio 0.8]
+"""
+import argparse
+import json
+import random
+import time
+
+from _setup import setup_django
+
+SECRET = 'whsec_benchmark'
+
+
+def build_event(i):
+    return {
+        'id': f'evt_{i:024d}',
+        'object': 'event',
+        'type': 'checkout.session.completed',
+        'created': int(time.time()),
+        'data': {'object': {
+            'id': f'cs_{i:024d}',
+            'object': 'checkout.session',
+            'customer': f'cus_{i:014d}',
+            'subscription': f'sub_{i:024d}',
+            'line_items': [{'price': 'price_x', 'quantity': 1}] * 20,
+            'metadata': {f'key{k}': 'x' * 32 for k in range(40)},
+        }},
+    }
+
+
+def build_traffic(events, replay_ratio, seed=42):
+    import stripe
+    rng = random.Random(seed)
+    bodies = [json.dumps(build_event(i), indent=2).encode() for i in range(events)]
+    deliveries = []
+    for body in bodies:
+        deliveries.append(body)
+        while rng.random() < replay_ratio:
+            deliveries.append(body)
+    rng.shuffle(deliveries)
+    return [
+        (body, stripe.WebhookSignature.generate_signature_header(body.decode(), SECRET))
+        for body in deliveries
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--replay-ratio', type=float, default=0.8)
+    args = parser.parse_args()
+
+    setup_django()
+    import stripe
+    from api_logic.services.webhook_verification import (
+        SeenEventCache, extract_event_id, verify_signature)
+
+    traffic = build_traffic(args.events, args.replay_ratio)
+    print(f"{len(traffic)} deliveries for {args.events} unique events")
+
+    started = time.perf_counter()
+    for body, header in traffic:
+        stripe.Webhook.construct_event(body, header, SECRET)
+    baseline = time.perf_counter() - started
+
+    cache = SeenEventCache(max_size=args.events, persist=False)
+    parsed = 0
+    started = time.perf_counter()
+    for body, header in traffic:
+        verify_signature(body, header, SECRET)
+        event_id = extract_event_id(body)
+        if cache.seen(event_id):
+            continue
+        json.loads(body)
+        parsed += 1
+        cache.mark(event_id)
+    fast = time.perf_counter() - started
+
+    for label, seconds in (('construct_event', baseline), ('fast path', fast)):
+        print(f"{label:>16}: {seconds / len(traffic) * 1e6:8.1f} us/delivery")
+    print(f"{'bodies parsed':>16}: {parsed} of {len(traffic)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api_logic.middleware.RequestProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,9 +91,70 @@ DATABASES = {
     }
 }
 
-PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+# Session storage profile. The API authenticates with knox tokens only, so
+# sessions are used by the admin alone:
+#   db             - django_session table (Django default)
+#   signed_cookies - no server-side storage, session lives in a signed cookie
+#   cache          - stored in CACHES['default'] (needs a shared cache, e.g. REDIS_URL)
+#   cached_db      - cache in front of the DB table
+SESSION_PROFILE = os.getenv('DJANGO_SESSION_PROFILE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}[SESSION_PROFILE]
+
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Token-only API logins: skip django.contrib.auth.login() and the session
+# write it causes. Set to False to also open a session on API login.
+API_TOKEN_ONLY_LOGIN = True
+
+# Password hashing. PASSWORD_HASHER picks the algorithm new hashes use
+# ('pbkdf2', 'scrypt' or 'argon2', the last needs argon2-cffi); the others stay
+# listed so existing hashes still verify. Costs come from
+# PASSWORD_HASHER_PARAMS: tune them to a target login latency with
+# `manage.py benchmark_hashers`. Stored hashes with another algorithm or cost
+# are upgraded on the user's next successful login.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+_PASSWORD_HASHER_PATHS = {
+    'pbkdf2': 'api_logic.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'api_logic.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api_logic.hashers.TunedArgon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_PATHS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_PATHS.items() if name != PASSWORD_HASHER
 ]
+PASSWORD_HASHER_PARAMS = {
+    'pbkdf2': {
+        'iterations': int(os.getenv('PBKDF2_ITERATIONS', '1000000')),
+    },
+    'scrypt': {
+        'work_factor': int(os.getenv('SCRYPT_WORK_FACTOR', str(2 ** 14))),
+        'block_size': int(os.getenv('SCRYPT_BLOCK_SIZE', '8')),
+        'parallelism': int(os.getenv('SCRYPT_PARALLELISM', '1')),
+    },
+    'argon2': {
+        'time_cost': int(os.getenv('ARGON2_TIME_COST', '2')),
+        'memory_cost': int(os.getenv('ARGON2_MEMORY_COST', '102400')),
+        'parallelism': int(os.getenv('ARGON2_PARALLELISM', '8')),
+    },
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,8 +194,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api_logic.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# 'auto' picks orjson and falls back to the stdlib encoder; 'msgspec' is opt-in.
+JSON_RENDERER_BACKEND = os.getenv('JSON_RENDERER_BACKEND', 'auto')
+
 
 email_host_secret = os.getenv('EMAIL_BACKEND_SECRET', "")
 
@@ -147,3 +217,75 @@ EMAIL_USE_TLS = True
 SECURE_HASH_ALGORITHM = 'sha256'
 TOKEN_TTL = 86400
 AUTO_REFRESH = True
+
+REST_KNOX = {
+    'TOKEN_TTL': timedelta(seconds=TOKEN_TTL),
+}
+
+# Expired token cleanup: run `manage.py purge_expired_tokens` from cron, or
+# set an interval (seconds) to purge from a background thread in each server
+# process (started by nadneshtata.wsgi/asgi, never by management commands).
+TOKEN_CLEANUP_INTERVAL = int(os.getenv('TOKEN_CLEANUP_INTERVAL', '0'))
+TOKEN_CLEANUP_BATCH_SIZE = int(os.getenv('TOKEN_CLEANUP_BATCH_SIZE', '1000'))
+
+# Stripe webhook replay protection: max signature age in seconds, the
+# number of processed event ids kept in memory per worker, and how many days
+# `manage.py purge_webhook_events` keeps processed ids in the database.
+STRIPE_WEBHOOK_TOLERANCE = 300
+STRIPE_WEBHOOK_SEEN_CACHE_SIZE = 10000
+STRIPE_WEBHOOK_EVENT_RETENTION_DAYS = 30
+
+# Plan catalog: seconds between cross-process version checks, and the
+# max-age sent to clients and shared caches for GET /api/plans/.
+PLAN_CATALOG_CHECK_INTERVAL = 5
+PLAN_CATALOG_MAX_AGE = 300
+
+# Opt-in pre-warming when a server loads nadneshtata.wsgi/asgi (e.g. for
+# autoscaled pods): opens DB connections, loads the URL resolver and lazily
+# imported modules and opens a keep-alive connection to Stripe. Management
+# commands never warm up; forked workers re-open their own connections.
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'false').lower() in ('1', 'true', 'yes')
+WARMUP_STEPS = ['database', 'url_resolver', 'lazy_modules', 'stripe']
+
+# Subscription change outbox relay (`manage.py relay_outbox`): 'file' writes
+# NDJSON to OUTBOX_FILE_PATH, 'http' POSTs NDJSON batches to OUTBOX_HTTP_URL.
+OUTBOX_SINK = os.getenv('OUTBOX_SINK', 'file')
+OUTBOX_FILE_PATH = os.getenv('OUTBOX_FILE_PATH', str(BASE_DIR / 'outbox.ndjson'))
+OUTBOX_HTTP_URL = os.getenv('OUTBOX_HTTP_URL', '')
+
+# Internal service keys for service-to-service endpoints, sent in the
+# X-Service-Key header. Format: "billing:key1,analytics:key2".
+INTERNAL_SERVICE_KEYS = dict(
+    item.split(':', 1) for item in os.getenv('INTERNAL_SERVICE_KEYS', '').split(',') if ':' in item
+)
+# Bulk entitlement endpoint: max ids per request and cache TTL in seconds (0 disables).
+# The cache needs a backend shared by all workers (REDIS_URL): invalidation only
+# reaches the cache it runs against, so with the LocMemCache fallback caching
+# is skipped and every request reads the database.
+ENTITLEMENT_BATCH_LIMIT = 5000
+ENTITLEMENT_CACHE_TTL = 60
+
+# On-demand request profiling (api_logic.middleware.RequestProfilingMiddleware).
+# Disabled, the middleware unloads itself at start-up. Enabled, staff trigger
+# it with `X-Profile: 1` / `?__profile=1` (`inline` returns the report as the
+# body) and PROFILING_SAMPLE_RATE profiles a random share of all requests.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOP_N = 30
+PROFILING_DUMP_DIR = os.getenv('PROFILING_DUMP_DIR', str(BASE_DIR / 'profiles'))
+
+# Subscription event streams (GET /api/users/<id>/subscription/events/).
+# 'local' delivers within one process; 'postgres' uses LISTEN/NOTIFY so any
+# worker's changes reach every worker's streams. Streams are served only
+# under ASGI (nadneshtata.asgi, e.g. `uvicorn nadneshtata.asgi:application`);
+# under WSGI (runserver, gunicorn) the endpoint answers 501.
+NOTIFICATION_BACKEND = os.getenv('NOTIFICATION_BACKEND', 'local')
+SSE_KEEPALIVE_SECONDS = 15
+# Browsers open a stream with a single-use ticket from
+# POST .../subscription/events/ticket/, valid for this many seconds.
+SSE_TICKET_TTL_SECONDS = 30
+# Max outbox events replayed to a client reconnecting with Last-Event-ID.
+SSE_REPLAY_LIMIT = 100
+
+# Batch endpoint (POST /api/batch/): max sub-requests per call.
+BATCH_MAX_REQUESTS = 20
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nadneshtata.settings')
 
 application = get_wsgi_application()
+
+from api_logic.services.token_service import TokenCleanupScheduler  # noqa: E402
+from api_logic.warmup import warm_up_on_start  # noqa: E402
+
+warm_up_on_start()
+TokenCleanupScheduler.start_from_settings()